@@ -28,8 +28,6 @@ class AppMainWindow(tk.Tk):
         super().__init__()
         self.title("リアルタイム解析ダッシュボード")
         self.geometry("1400x900")
-        self.data_queue = multiprocessing.Queue()
-        self.frame_queue = multiprocessing.Queue(maxsize=2)
         self.status_queue = multiprocessing.Queue()
 
         # 1. Controllerインスタンスを作成
@@ -52,6 +50,9 @@ class AppMainWindow(tk.Tk):
         # 5. 最後に、UIの初期状態を設定
         self.controller._on_mode_change()
 
+        # ウィンドウを閉じるときは、計算スレッドや映像処理プロセスを止めてから終了する
+        self.protocol("WM_DELETE_WINDOW", self.controller.shutdown)
+
     def _setup_ui(self):
         """UI要素の作成と配置に専念するメソッド"""
         # --- 1. 最上部のフォーカスパネル ---
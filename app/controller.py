@@ -1,10 +1,12 @@
 # ファイル名: controller.py
 
+import logging
 import queue
 import threading
 import tkinter as tk
 from tkinter import filedialog, messagebox
 
+import numpy as np
 import pandas as pd
 
 # 外部ファイルをインポート
@@ -14,12 +16,18 @@ from core.data_processor import DataProcessor
 # Modelをインポート
 from core.model import AnalysisModel
 from core.analysis_service import AnalysisService 
+from core.feature_worker import FeatureWorker
 from core.save_manager import SaveManager
 from app.views.config_dialog import ConfigDialog
 from .mode_handler.csv_replay_handler import CsvReplayHandler
 from .mode_handler.realtime_handler import RealtimeHandler
 from services.process_utils import Status
 
+logger = logging.getLogger(__name__)
+
+# 計算スレッドの結果を確認する間隔 (ミリ秒)
+SNAPSHOT_POLL_MS = 10
+
 
 class AppController:
     def __init__(self, app, status_queue):
@@ -27,13 +35,15 @@ class AppController:
         self.status_queue = status_queue # 【追加】
         self.model = AnalysisModel()
         self.data_processor = DataProcessor()
-        self.analysis_service = AnalysisService(self.model, self.data_processor)
         self.config_manager = ConfigManager()
-        self.save_manager = SaveManager(self)
 
         # analysis_parametersを一括で読み込んでおく
 
         self.analysis_params = self.config_manager.config.analysis_parameters
+        self.analysis_service = AnalysisService(self.model, self.data_processor, self.analysis_params)
+        # ティックごとの特徴量の計算は専用スレッドで行い、UIスレッドは結果の反映と描画だけを行う
+        self.feature_worker = FeatureWorker(self.analysis_service)
+        self.save_manager = SaveManager(self)
         self.update_interval = self.analysis_params.UPDATE_INTERVAL_MS
         self.sliding_window = self.analysis_params.SLIDING_WINDOW_SECONDS
 
@@ -48,6 +58,8 @@ class AppController:
         self.after_id = None
         self.status_check_after_id = None # 【追加】ステータス監視用のID
         self.preview_after_id = None        
+        self.snapshot_after_id = None # 計算結果の受け取り待ち用のID
+        self.capture_metrics = None # 映像処理プロセスから届いた最新の処理時間の要約
         self.is_realtime_mode = False
         self.is_display_paused = False
         self.focused_ids = []
@@ -109,13 +121,37 @@ class AppController:
         self.current_mode_handler.stop()
         self.app.ui_manager.update_control_buttons_state()
 
+        # 停止後のスライダー操作に備えて、各時点の特徴量を事前計算しておく
+        if self.model.full_history:
+            self.analysis_service.build_timeline()
+
         if isinstance(self.current_mode_handler, RealtimeHandler):
             self._start_preview_loop()
 
+    def shutdown(self):
+        """
+        ウィンドウが閉じられたときの終了処理。
+        予約中のループを止め、解析・映像処理プロセス・計算スレッドを停止してからウィンドウを破棄する。
+        """
+        self._stop_preview_loop()
+        self.stop_update_loop()
+        for after_id in (self.status_check_after_id, self.snapshot_after_id):
+            if after_id:
+                self.app.after_cancel(after_id)
+        self.status_check_after_id = self.snapshot_after_id = None
+
+        self.current_mode_handler.stop()
+        self.current_mode_handler.on_mode_deselected()
+        self.analysis_service.timeline.invalidate() # 構築中のタイムラインがあれば打ち切る
+        self.feature_worker.stop() # 計算中の依頼が終わるのを (最大2秒) 待ってからスレッドを終了する
+        self.app.destroy()
+
     def toggle_pause(self):
         """一時停止と再開を切り替える"""
         self.current_mode_handler.toggle_pause()
         self.app.ui_manager.update_control_buttons_state()
+        if self.current_mode_handler.is_paused and self.model.full_history:
+            self.analysis_service.build_timeline()
 
     def start_update_loop(self):
         """定期的なデータ処理とUI更新ループを開始する"""
@@ -149,12 +185,6 @@ class AppController:
             self.app.after_cancel(self.preview_after_id)
             self.preview_after_id = None
 
-    def _process_and_store_features(self, full_slice, sliding_slice=None):
-        """
-        【変更】AnalysisServiceに処理を委譲する
-        """
-        return self.analysis_service.process_and_store_features(full_slice, sliding_slice)
-
     def save_plots(self):
         """SaveManagerにグラフ保存処理を依頼する"""
         # 保存処理を開始する前に、関連する状態フラグをリセットする
@@ -168,7 +198,7 @@ class AppController:
             self.app.ui_manager.show_error("保存エラー", "保存できる有効なデータがありません。")
             return
         
-        timestamp_to_save = self.model.full_history[save_index]['timestamp']
+        timestamp_to_save = self.model.full_history.timestamps[save_index]
         self.save_manager.save_all_plots(timestamp_to_save)
 
     def _on_slider_change(self, event):
@@ -179,6 +209,7 @@ class AppController:
 
         self.app.ui_manager.set_rt_button_state('normal')
         
+        # 事前計算済みの時点であればタイムラインの値が使われ、それ以外の時点はその場で計算される
         timestamp_index = int(self.app.slider.get())
         self.process_data_and_update_views(history_index=timestamp_index)
 
@@ -206,12 +237,12 @@ class AppController:
         print("INFO: 全てのデータをリセットします。")
 
         # Modelのデータをリセット
-        self.model.full_history = []
+        self.analysis_service.reset()
+        self.model.reset_history()
         self.model.active_ids = []
         self.model.time_series_df = None
         self.model.csv_replay_data = None
-        self.model.last_power_spectrums = {}
-        self.model.last_slope_dfs = {}
+        self.model.set_features({}, {})
 
         # Controllerの状態変数をリセット
         self.focused_ids = []
@@ -232,7 +263,7 @@ class AppController:
             self._update_time_inputs_to_current()
             return
 
-        timestamps = [dp['timestamp'] for dp in self.model.full_history]
+        timestamps = self.model.full_history.timestamps
         
         # 入力値が有効範囲内かチェック
         if not (timestamps[0] <= target_time <= timestamps[-1]):
@@ -241,8 +272,7 @@ class AppController:
             return
 
         # 入力された時間に最も近いデータ点のインデックスを探す
-        time_diffs = [abs(ts - target_time) for ts in timestamps]
-        closest_index = time_diffs.index(min(time_diffs))
+        closest_index = int(np.abs(timestamps - target_time).argmin())
 
         # スライダーを更新し、全体の再描画をトリガーする
         self.app.slider.set(closest_index)
@@ -253,8 +283,8 @@ class AppController:
         if not self.model.full_history: return
         try:
             current_index = int(self.app.slider.get())
-            current_time = self.model.full_history[current_index]['timestamp']
-            total_time = self.model.full_history[-1]['timestamp']
+            current_time = self.model.full_history.timestamps[current_index]
+            total_time = self.model.full_history.timestamps[-1]
             self.app.time_input_var.set(f"{current_time:.1f}")
             self.app.total_time_var.set(f"s / {total_time:.1f}s")
         except (IndexError, KeyError):
@@ -296,21 +326,7 @@ class AppController:
         """【バックグラウンドで実行】一括解析の重い計算処理。"""
         try:
             print("INFO: (別スレッド) 一括解析の計算処理を開始します。")
-            all_data_history = []
-            
-            for timestamp, row in self.model.csv_replay_data.iterrows():
-                packet = {'timestamp': timestamp}
-                for id_name in self.model.active_ids:
-                    id_data = {}
-                    for var in ALL_VARIABLES:
-                        col_name = f"{id_name}_{var}"
-                        if col_name in row and not pd.isna(row[col_name]):
-                            id_data[var] = row[col_name]
-                    if id_data:
-                        packet[id_name] = id_data
-                all_data_history.append(packet)
-
-            df_full_features = self.analysis_service.perform_batch_analysis(all_data_history)
+            df_full_features = self.analysis_service.perform_batch_analysis(self.model.csv_replay_data)
             self.batch_result_df = df_full_features
 
         except Exception as e:
@@ -347,10 +363,9 @@ class AppController:
             is_running_in_realtime = (history_index is None and self.current_mode_handler.is_running)
 
             if is_running_in_realtime:
-                new_data = self.current_mode_handler.get_next_data_packet()
-                if new_data:
-                    self.model.full_history.append(new_data)
-                else:
+                # 届いているデータはまとめて取り込み、特徴量の計算はティックごとに1回だけ行う
+                appended = self.current_mode_handler.ingest_into(self.model.full_history)
+                if appended is None:
                     self.stop_analysis()
                     self.app.ui_manager.show_info("完了", "再生が完了しました。")
                     return
@@ -362,10 +377,14 @@ class AppController:
             full_slice_data = self.model.full_history[:target_index + 1]
             sliding_slice_data = self.model.full_history[max(0, target_index - self.sliding_window + 1) : target_index + 1]
 
-            self._process_and_store_features(full_slice=full_slice_data, sliding_slice=sliding_slice_data)
-            if not self.is_display_paused:
-                self.app.ui_manager.update_active_view(self.model)
-                self.app.ui_manager.update_slider_and_time(self.model, target_index)
+            # 計算は専用スレッドに依頼し、結果は _apply_feature_snapshot で受け取る
+            # スペクトルのビューが表示中なら、表示する範囲のスペクトルも計算スレッドで求めておく
+            spectrum_keys = ()
+            if self.app.ui_manager.is_view_visible("spectrum"):
+                spectrum_keys = (self.app.views["spectrum"].time_range_key,)
+            self.feature_worker.submit(self.model.full_history, target_index, full_slice_data, sliding_slice_data,
+                                       self.model.active_ids, spectrum_keys)
+            self._schedule_snapshot_check()
 
         except (queue.Empty, IndexError):
             pass
@@ -373,6 +392,25 @@ class AppController:
         if self.current_mode_handler.is_running and history_index is None:
             self.after_id = self.app.after(self.update_interval, self.process_data_and_update_views)
 
+    def _schedule_snapshot_check(self):
+        """計算結果の受け取りを予約する (予約済みなら何もしない)"""
+        if self.snapshot_after_id is None:
+            self.snapshot_after_id = self.app.after(SNAPSHOT_POLL_MS, self._apply_feature_snapshot)
+
+    def _apply_feature_snapshot(self):
+        """【UIスレッドで実行】計算スレッドの最新の結果をモデルに反映し、ビューを更新する"""
+        self.snapshot_after_id = None
+        snapshot = self.feature_worker.take_snapshot()
+        # 計算中にデータがリセット・再読み込みされた場合、古いhistoryの結果は捨てる
+        if snapshot is not None and snapshot.history is self.model.full_history:
+            self.model.set_features(snapshot.slope_dfs, snapshot.power_spectrums)
+            if not self.is_display_paused:
+                self.app.ui_manager.request_view_updates(self.model)
+                self.app.ui_manager.update_slider_and_time(self.model, snapshot.target_index)
+
+        if self.feature_worker.is_busy:
+            self._schedule_snapshot_check()
+
     def save_features_to_csv(self):
         """
         全区間の分析で得られた特徴量（傾き）をCSVファイルに保存する。
@@ -443,6 +481,7 @@ class AppController:
 
     def _trigger_view_update(self):
         """UIの表示オプション（時間範囲など）の変更時に再描画をトリガーする"""
+        self.app.ui_manager.options_changed()
         self._refresh_views()
 
     def _refresh_views(self):
@@ -466,22 +505,16 @@ class AppController:
                 return
 
             print("INFO: 計算完了を検知。UIを更新します。")
-            df_full = self.batch_result_df
-            
-            duration = self.model.csv_replay_data.index.max() if self.model.csv_replay_data is not None else 0
-            
-            # UIManager経由で各Viewを更新
-            self.app.ui_manager.views["clustering"].update_plot(df_full, pd.DataFrame(), duration, 0)
-            self.app.ui_manager.views["radar"].update_plot()
-            self.app.ui_manager.views["spectrum"].update_plot()
-            self.app.ui_manager.views["kmeans"].update_plot(df_full, pd.DataFrame(), duration, 0)
-            self.app.ui_manager.views["heatmap"].update_plot(df_full, pd.DataFrame(), duration, 0)
+
+            # UIManager経由で各Viewの更新を依頼する (非表示のタブは表示されたときに描画される)
+            self.app.ui_manager.request_view_updates(self.model)
 
             if self.model.full_history:
+                self.analysis_service.build_timeline()
                 last_index = len(self.model.full_history) - 1
                 self.app.slider.config(to=last_index)
                 self.app.slider.set(last_index)
-                last_timestamp = self.model.full_history[-1]['timestamp']
+                last_timestamp = self.model.full_history.timestamps[-1]
                 self.app.elapsed_time_var.set(f"経過時間: {last_timestamp:.1f}s")
             self.app.update_idletasks()
 
@@ -506,6 +539,14 @@ class AppController:
                 elif msg.status == Status.COMPLETED:
                     self.app.ui_manager.show_info("完了", msg.message)
                     self.stop_analysis() # 正常完了時も解析を停止
+                elif msg.status == Status.METRICS:
+                    # 映像処理プロセスの処理段階ごとの所要時間 (ダイアログは出さずログにのみ残す)
+                    self.capture_metrics = msg.data
+                    logger.info(f"映像処理の所要時間: {msg.message}")
+                    backlog = getattr(self.current_mode_handler, 'backlog_stats', None)
+                    if backlog:
+                        logger.info(f"特徴量の取り込み状況: 滞留 {backlog['pending_frames']}フレーム, 遅延 {backlog['lag_seconds']:.2f}秒, "
+                                    f"間引き {backlog['discarded_frames']}フレーム, 読み落とし {backlog['dropped_records']}件")
 
         except queue.Empty:
             pass
@@ -531,6 +572,7 @@ class AppController:
         self.analysis_params = self.config_manager.config.analysis_parameters
         self.update_interval = self.analysis_params.UPDATE_INTERVAL_MS
         self.sliding_window = self.analysis_params.SLIDING_WINDOW_SECONDS
+        self.analysis_service.update_parameters(self.analysis_params)
         
         if self.app.mode.get() == "realtime":
             self._on_mode_change()
@@ -19,7 +19,7 @@ class CsvReplayHandler(ModeHandlerBase):
 
     def _start_specifics(self):
         """CSVモード固有の開始処理"""
-        self.model.full_history = []
+        self.model.reset_history()
         self.csv_replay_index = 0
         print(f"CSV再生を開始します。対象ID: {self.model.active_ids}")
 
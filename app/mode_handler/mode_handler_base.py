@@ -49,6 +49,17 @@ class ModeHandlerBase(ABC):
         """次のデータパケットを取得する"""
         pass
 
+    def ingest_into(self, history):
+        """
+        次のデータをhistoryに追記し、追記した時点数を返す。データの終端に達した場合はNoneを返す。
+        (既定では1回に1パケットずつ取り込む)
+        """
+        packet = self.get_next_data_packet()
+        if not packet:
+            return None
+        history.append(packet)
+        return 1
+
     def _before_start(self):
         """startが呼ばれた直後、ループ開始前に行うチェック処理"""
         return True # デフォルトでは常に成功
@@ -1,18 +1,34 @@
 # app/mode_handler/realtime_handler.py (修正)
 
-import queue
+import logging
 import multiprocessing
 import time
+from collections import deque
+
+import numpy as np
+from constants import ALL_VARIABLES
 from .mode_handler_base import ModeHandlerBase
 from services.capture_service import CaptureService
+from services.pipelined_capture_service import PipelinedCaptureService
+from services.shared_frame_ring import SharedFrameRing
+from services.shared_feature_ring import SharedFeatureRing
 import dataclasses
 
+logger = logging.getLogger(__name__)
+
 class RealtimeHandler(ModeHandlerBase):
     """リアルタイム解析モードのロジックを担当するクラス。"""
     def __init__(self, controller):
         super().__init__(controller)
-        self.data_queue = self.controller.app.data_queue
-        self.frame_queue = self.controller.app.frame_queue
+        # 映像処理プロセスとの特徴量・フレームの受け渡し用 (モード選択中のみ存在)
+        self.feature_ring = None
+        self.frame_ring = None
+        self._pending_packets = deque() # 共有メモリから取り出し、まだ渡していないパケット
+        # 取り込みが追いつかないときの方針と、その状況 (滞留数・遅延) の記録
+        self.backlog_policy = "keep_all"
+        self.backlog_max_frames = 30
+        self._reset_backlog_stats()
+        self._last_backlog_warning = 0.0
         self.status_queue = self.controller.status_queue
         self.capture_service = None
         # 【追加】解析モードを制御するためのイベント
@@ -25,8 +41,21 @@ class RealtimeHandler(ModeHandlerBase):
 
         rt_config_obj = self.controller.config_manager.config.realtime_settings
         rt_config_dict = dataclasses.asdict(rt_config_obj)
+        self.backlog_policy = rt_config_obj.backlog_policy
+        self.backlog_max_frames = max(1, rt_config_obj.backlog_max_frames)
 
-        self.capture_service = CaptureService(self.data_queue, self.frame_queue, self.status_queue, rt_config_dict, self.analysis_active)
+        self.frame_ring = SharedFrameRing(
+            slots=rt_config_obj.frame_ring_slots,
+            max_width=rt_config_obj.frame_max_width,
+            max_height=rt_config_obj.frame_max_height
+        )
+        self.feature_ring = SharedFeatureRing(
+            capacity=rt_config_obj.feature_ring_capacity,
+            max_ids=rt_config_obj.feature_ring_max_ids
+        )
+        # "pipelined" では取得・追跡・抽出を別プロセスに分けて並行させる
+        service_class = PipelinedCaptureService if rt_config_obj.capture_mode == "pipelined" else CaptureService
+        self.capture_service = service_class(self.feature_ring, self.frame_ring, self.status_queue, rt_config_dict, self.analysis_active)
         self.capture_service.start()
 
         # UIボタンの状態を更新
@@ -43,6 +72,13 @@ class RealtimeHandler(ModeHandlerBase):
         if self.capture_service:
             self.capture_service.stop()
             self.capture_service = None
+        if self.frame_ring:
+            self.frame_ring.close()
+            self.frame_ring = None
+        if self.feature_ring:
+            self.feature_ring.close()
+            self.feature_ring = None
+        self._pending_packets.clear()
         
         self.controller._stop_preview_loop()
         self.app.start_button.config(state="disabled")
@@ -51,8 +87,13 @@ class RealtimeHandler(ModeHandlerBase):
         """「解析開始」ボタンが押されたときの処理"""
         print("INFO: 解析開始ボタン押下。解析モードに移行します。")
         self.analysis_active.set() # 解析モードをONにする
-        self.model.full_history = []
+        self.model.reset_history()
         self.model.active_ids = []
+        # 前回の解析の停止後に届いたレコードは捨てる
+        self._pending_packets.clear()
+        if self.feature_ring:
+            self.feature_ring.drain()
+        self._reset_backlog_stats()
 
     def _stop_specifics(self):
         """「停止」ボタンが押されたときの処理"""
@@ -70,21 +111,114 @@ class RealtimeHandler(ModeHandlerBase):
             print("リアルタイム解析を再開しました。")
             
     def get_next_data_packet(self):
-        try:
-            packet = self.data_queue.get_nowait()
-            new_ids = [k for k in packet.keys() if k.startswith('ID_') and k not in self.model.active_ids]
-            if new_ids:
-                self.model.active_ids.extend(new_ids)
-                self.model.active_ids.sort()
-            return packet
-        except queue.Empty:
+        if not self._pending_packets:
+            self._drain_feature_ring()
+        if not self._pending_packets:
             return None
 
+        packet = self._pending_packets.popleft()
+        self._add_active_ids(k for k in packet.keys() if k.startswith('ID_'))
+        return packet
+
+    def ingest_into(self, history):
+        """
+        未読の特徴量をすべて取り出し、バックログ方針を適用してからhistoryへまとめて追記する。
+        リアルタイムでは新しいデータがなくても終了扱いにはしないため、Noneは返さない。
+        """
+        # get_next_data_packetで取り出し済みのパケットがあれば先に追記する
+        appended = len(self._pending_packets)
+        while self._pending_packets:
+            history.append(self._pending_packets.popleft())
+
+        timestamps, id_names, values = self._drain_block()
+        pending_frames = len(timestamps)
+        timestamps, values = self._apply_backlog_policy(timestamps, values)
+        history.append_block(timestamps, id_names, values)
+        self._add_active_ids(id_names)
+        appended += len(timestamps)
+
+        self._update_backlog_stats(pending_frames, len(timestamps))
+        return appended
+
+    def _add_active_ids(self, id_names):
+        new_ids = [id_name for id_name in id_names if id_name not in self.model.active_ids]
+        if new_ids:
+            self.model.active_ids.extend(new_ids)
+            self.model.active_ids.sort()
+
+    def _drain_block(self):
+        """
+        共有メモリの未読レコードをまとめて取り出し、(タイムスタンプ, ID名, 時点 × ID × 変数の配列) に並べ替える。
+        1人も記録のないIDの値はNaNになる。
+        """
+        records = self.feature_ring.drain() if self.feature_ring else []
+        if len(records) == 0:
+            return np.empty(0), [], np.empty((0, 0, len(ALL_VARIABLES)))
+
+        # 同じフレームのレコードは連続して書き込まれるので、frame_seqの変わり目で区切る
+        is_frame_start = np.r_[True, np.diff(records['frame_seq']) != 0]
+        frame_index = np.cumsum(is_frame_start) - 1
+        track_ids, id_index = np.unique(records['track_id'], return_inverse=True)
+
+        values = np.full((int(frame_index[-1]) + 1, len(track_ids), len(ALL_VARIABLES)), np.nan)
+        values[frame_index, id_index] = records['values']
+        id_names = [self.feature_ring.id_names[track_id] for track_id in track_ids.tolist()]
+        return records['timestamp'][is_frame_start], id_names, values
+
+    def _drain_feature_ring(self):
+        """共有メモリの未読レコードをまとめて取り出し、フレームごとのパケットに組み立てる"""
+        timestamps, id_names, values = self._drain_block()
+        for timestamp, frame_values in zip(timestamps.tolist(), values):
+            packet = {'timestamp': timestamp}
+            for id_name, id_values in zip(id_names, frame_values.tolist()):
+                id_data = {var: value for var, value in zip(ALL_VARIABLES, id_values) if value == value}
+                if id_data:
+                    packet[id_name] = id_data
+            self._pending_packets.append(packet)
+
+    def _apply_backlog_policy(self, timestamps, values):
+        """
+        取り込みが追いつかず backlog_max_frames を超える時点がたまっていた場合に、設定された方針で間引く。
+            keep_all: すべて取り込む / drop_oldest: 新しい方から上限数だけ残す /
+            coalesce: 上限数のグループに分けて平均する (タイムスタンプは各グループの最後)
+        """
+        num_frames = len(timestamps)
+        max_frames = self.backlog_max_frames
+        if self.backlog_policy == "keep_all" or num_frames <= max_frames:
+            return timestamps, values
+
+        if self.backlog_policy == "coalesce":
+            bounds = np.linspace(0, num_frames, max_frames + 1).astype(int)
+            sums = np.add.reduceat(np.nan_to_num(values), bounds[:-1], axis=0)
+            counts = np.add.reduceat(~np.isnan(values), bounds[:-1], axis=0)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                values = np.where(counts > 0, sums / counts, np.nan)
+            timestamps = timestamps[bounds[1:] - 1]
+        else: # "drop_oldest"
+            timestamps, values = timestamps[-max_frames:], values[-max_frames:]
+
+        self.backlog_stats['discarded_frames'] += num_frames - max_frames
+        now = time.monotonic()
+        if now - self._last_backlog_warning >= 5.0:
+            logger.warning(f"特徴量の取り込みが遅れています ({num_frames}フレーム滞留)。方針 '{self.backlog_policy}' で{max_frames}フレームに間引きました。")
+            self._last_backlog_warning = now
+        return timestamps, values
+
+    def _reset_backlog_stats(self):
+        self.backlog_stats = {'pending_frames': 0, 'appended_frames': 0, 'discarded_frames': 0, 'lag_seconds': 0.0, 'dropped_records': 0}
+
+    def _update_backlog_stats(self, pending_frames, appended_frames):
+        """取り込みの遅れ (滞留フレーム数・最新データの遅延秒数) を記録する"""
+        stats = self.backlog_stats
+        stats['pending_frames'] = pending_frames
+        stats['appended_frames'] = appended_frames
+        if self.model.full_history:
+            stats['lag_seconds'] = max(0.0, time.time() - float(self.model.full_history.timestamps[-1]))
+        if self.feature_ring:
+            stats['dropped_records'] = self.feature_ring.dropped_records
+
     def get_latest_frame(self):
-        frame = None
-        if not self.frame_queue.empty():
-            try:
-                frame = self.frame_queue.get_nowait()
-            except queue.Empty:
-                pass
-        return frame
\ No newline at end of file
+        """前回の取得以降に新しいフレームがあれば、共有メモリ上の最新フレームをコピーせずに返す"""
+        if self.frame_ring is None:
+            return None
+        return self.frame_ring.read_latest()
\ No newline at end of file
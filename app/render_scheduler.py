@@ -0,0 +1,68 @@
+# ファイル名: app/render_scheduler.py (新規作成)
+
+import time
+
+class RenderScheduler:
+    """
+    各ビューの再描画をまとめて管理するクラス。
+
+    - request(key, version, render) で再描画を依頼する。前回描画したときと version が同じなら何もしない。
+    - 同じビューへの依頼は最新のものだけを残し、frame_budget_ms ごとに1回だけまとめて描画する。
+    - 非表示のビュー (選択されていないタブなど) の描画は、表示されるまで保留する。
+    """
+    def __init__(self, tk_root, is_visible, frame_budget_ms=33):
+        self.tk_root = tk_root
+        self.is_visible = is_visible # key → 表示中かどうか
+        self.frame_budget = frame_budget_ms / 1000
+        self._pending = {} # key → (version, render)
+        self._rendered_versions = {} # key → 最後に描画したときのversion
+        self._after_id = None
+        self._last_flush = 0.0
+        self.skipped = 0 # 入力が変わっていないため省略した依頼の数
+        self.deferred = 0 # 非表示のため保留した回数
+
+    def request(self, key, version, render):
+        """ビュー key の再描画を依頼する"""
+        if self._rendered_versions.get(key) == version:
+            self._pending.pop(key, None) # 描画済みの内容に戻った場合は、保留中の依頼も不要
+            self.skipped += 1
+            return
+        self._pending[key] = (version, render)
+        self._schedule()
+
+    def visibility_changed(self):
+        """タブの切り替えなどで表示中のビューが変わったときに呼ぶ (保留中の描画を行う)"""
+        if self._pending:
+            self._schedule()
+
+    def invalidate(self, key=None):
+        """描画済みのversionを忘れる (次の依頼は必ず描画する)。keyがNoneなら全ビュー"""
+        if key is None:
+            self._rendered_versions.clear()
+        else:
+            self._rendered_versions.pop(key, None)
+
+    def cancel(self):
+        """保留中の依頼と予約済みの描画を破棄する"""
+        self._pending.clear()
+        if self._after_id is not None:
+            self.tk_root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _schedule(self):
+        if self._after_id is not None:
+            return # 既に予約済み (依頼はその描画でまとめて処理される)
+        delay = max(0.0, self.frame_budget - (time.perf_counter() - self._last_flush))
+        self._after_id = self.tk_root.after(int(delay * 1000), self.flush)
+
+    def flush(self):
+        """保留中の依頼のうち、表示中のビューのものを描画する"""
+        self._after_id = None
+        self._last_flush = time.perf_counter()
+        for key in list(self._pending):
+            if not self.is_visible(key):
+                self.deferred += 1
+                continue
+            version, render = self._pending.pop(key)
+            render()
+            self._rendered_versions[key] = version
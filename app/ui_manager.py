@@ -2,6 +2,11 @@
 import tkinter as tk
 import pandas as pd
 from tkinter import messagebox
+from core.feature_timeline import LazyPowerSpectrums
+from .render_scheduler import RenderScheduler
+
+# 解析結果を表示するビュー (リアルタイム映像以外)
+ANALYSIS_VIEW_KEYS = ("clustering", "spectrum", "radar", "kmeans", "heatmap")
 
 class UIManager:
     def __init__(self, app_instance):
@@ -17,6 +22,10 @@ class UIManager:
         self.analysis_params = self.controller.config_manager.config.analysis_parameters
         self.sliding_window = self.analysis_params.SLIDING_WINDOW_SECONDS
 
+        # ビューの再描画は、入力が変わったときだけ・表示中のものだけ・1フレームに1回にまとめて行う
+        self.render_scheduler = RenderScheduler(self.app, self.is_view_visible)
+        self.options_version = 0 # ビューの表示オプション (時間範囲・変数の選択など) が変わるたびに増える
+        self.app.notebook.bind("<<NotebookTabChanged>>", lambda event: self.render_scheduler.visibility_changed(), add="+")
 
     def show_info(self, title, message):
         """情報メッセージボックスを表示する"""
@@ -43,9 +52,11 @@ class UIManager:
         """確認(Yes/No)メッセージボックスを表示し、結果を返す"""
         return messagebox.askyesno(title, message)
 
-    def update_active_view(self, model_data):
+    def request_view_updates(self, model_data):
         """
-        現在アクティブなタブのビューを、最新のデータで更新する。
+        解析結果の各ビューの再描画を依頼する。
+        入力 (計算結果・フォーカスID・表示オプション) が前回の描画から変わっていないビューは描画せず、
+        非表示のタブは表示されたときに描画する。
         """
         # リアルタイムモードの場合、常に映像を更新する
         if self.controller.current_mode_handler.__class__.__name__ == 'RealtimeHandler':
@@ -56,47 +67,53 @@ class UIManager:
         if not model_data.full_history:
             return
 
-        # アクティブなタブのウィジェットを取得する
-        active_view_key = None
+        version = (model_data.features_version, tuple(self.controller.focused_ids), self.options_version)
+        for key in ANALYSIS_VIEW_KEYS:
+            self.render_scheduler.request(key, version, lambda key=key: self._render_view(key, model_data))
+
+    def options_changed(self):
+        """ビューの表示オプションが変わったことを記録する (次の依頼で全ビューを描画し直す)"""
+        self.options_version += 1
+
+    def is_view_visible(self, key):
+        """ビューが表示中か (選択中のタブか、スペクトルの別ウィンドウが開いているか)"""
         try:
             selected_tab_id = self.app.notebook.select()
-            if selected_tab_id:
-                active_widget = self.app.notebook.nametowidget(selected_tab_id)
-                # ウィジェットオブジェクトを直接比較して、どのビューがアクティブかを探す
-                for key, view_widget in self.views.items():
-                    if view_widget == active_widget:
-                        active_view_key = key
-                        break
+            if selected_tab_id and self.app.notebook.nametowidget(selected_tab_id) is self.views[key]:
+                return True
         except tk.TclError:
-            return # ウィンドウ終了時などのエラーは無視
+            return False # ウィンドウ終了時などのエラーは無視
+        spectrum_window = getattr(self.views[key], 'spectrum_window', None)
+        return bool(spectrum_window and spectrum_window.winfo_exists())
 
-        # アクティブなビューが見つからなければ、何もせず終了
-        if not active_view_key:
+    def _render_view(self, key, model_data):
+        """ビュー key を、モデルの現在の内容で描画する"""
+        if not model_data.full_history:
             return
-            
-        # 2. フィルタリングされたデータを準備
+
+        # フィルタリングされたデータを準備
         df_full_filtered, df_sliding_filtered, ps_filtered = self._get_filtered_data(model_data)
 
-        # 3. 期間（秒数）を計算
-        current_timestamp = model_data.full_history[-1].get('timestamp', 0)
+        # 期間（秒数）を計算
+        current_timestamp = model_data.full_history.timestamps[-1]
         full_duration = current_timestamp
         sliding_duration = self.sliding_window
 
-        # 4. アクティブなViewに応じて、適切なデータを渡して更新
-        if 'clustering' in active_view_key.lower():
+        # ビューに応じて、適切なデータを渡して更新
+        if key == "clustering":
             self.views["clustering"].update_plot(df_full_filtered, df_sliding_filtered, full_duration, sliding_duration)
         
-        elif 'spectrum' in active_view_key.lower():
+        elif key == "spectrum":
             self.views["spectrum"].update_plot(ps_filtered)
 
-        elif 'radar' in active_view_key.lower():
+        elif key == "radar":
             radar_dfs = {'sliding': df_sliding_filtered, 'full': df_full_filtered}
             self.views["radar"].update_plot(radar_dfs)
 
-        elif 'kmeans' in active_view_key.lower():
+        elif key == "kmeans":
             self.views["kmeans"].update_plot(df_full_filtered, df_sliding_filtered, full_duration, sliding_duration)
 
-        elif 'heatmap' in active_view_key.lower():
+        elif key == "heatmap":
             self.views["heatmap"].update_plot(df_full_filtered, df_sliding_filtered, full_duration, sliding_duration)
 
     def _get_filtered_data(self, model_data):
@@ -112,9 +129,11 @@ class UIManager:
             df_full_filtered = df_full[df_full.index.isin(focused_ids)]
             df_sliding_filtered = df_sliding[df_sliding.index.isin(focused_ids)]
             
-            ps_sliding_filtered = {id_name: data for id_name, data in ps_data.get('sliding', {}).items() if id_name in focused_ids}
-            ps_full_filtered = {id_name: data for id_name, data in ps_data.get('full', {}).items() if id_name in focused_ids}
-            ps_filtered = {'sliding': ps_sliding_filtered, 'full': ps_full_filtered}
+            # スペクトルは表示する範囲の分だけ参照されるよう、フィルタリングも遅延させる
+            ps_filtered = LazyPowerSpectrums({
+                key: (lambda key=key: {id_name: data for id_name, data in ps_data.get(key, {}).items() if id_name in focused_ids})
+                for key in ('sliding', 'full')
+            })
         else:
             df_full_filtered, df_sliding_filtered = df_full, df_sliding
             ps_filtered = ps_data
@@ -130,12 +149,12 @@ class UIManager:
                 self.app.slider.set(current_max_index)
         
         try:
-            playback_time = model_data.full_history[history_index]['timestamp']
+            playback_time = model_data.full_history.timestamps[history_index]
             self.app.elapsed_time_var.set(f"経過時間: {playback_time:.1f}s")
 
             # 再生時間の手入力ボックスも更新
             if not self.controller.is_realtime_mode:
-                total_time = model_data.full_history[-1]['timestamp']
+                total_time = model_data.full_history.timestamps[-1]
                 self.app.time_input_var.set(f"{playback_time:.1f}")
                 self.app.total_time_var.set(f"s / {total_time:.1f}s")
         except (IndexError, KeyError):
@@ -166,6 +185,9 @@ class UIManager:
 
     def clear_all_views(self):
         """全てのグラフを空の状態で再描画する"""
+        # 保留中の描画を破棄し、次のデータは必ず描画されるようにする
+        self.render_scheduler.cancel()
+        self.render_scheduler.invalidate()
         empty_df = pd.DataFrame()
         empty_ps = {}
         
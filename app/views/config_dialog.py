@@ -1,7 +1,7 @@
 import tkinter as tk
 from tkinter import ttk
 from tkinter import messagebox
-from core.config_manager import AppConfig, FFTInitialViewConfig, RealtimeSettingsConfig, AnalysisParametersConfig
+from core.config_manager import AppConfig, FFTInitialViewConfig
 import dataclasses
 from utils.camera_utils import get_available_cameras
 
@@ -30,6 +30,7 @@ class ConfigDialog(tk.Toplevel):
         self.rt_device = tk.StringVar(value=self.config_data.realtime_settings.device)
         self.an_update_interval = tk.IntVar(value=self.config_data.analysis_parameters.UPDATE_INTERVAL_MS)
         self.an_sliding_window = tk.IntVar(value=self.config_data.analysis_parameters.SLIDING_WINDOW_SECONDS)
+        self.an_full_spectrum_mode = tk.StringVar(value=self.config_data.analysis_parameters.FULL_SPECTRUM_MODE)
 
         self._setup_ui()
 
@@ -117,6 +118,9 @@ class ConfigDialog(tk.Toplevel):
 
         ttk.Label(an_frame, text="スライディング窓 (秒):").grid(row=1, column=0, sticky='w', pady=2)
         ttk.Entry(an_frame, textvariable=self.an_sliding_window).grid(row=1, column=1, sticky='we', pady=2)
+
+        ttk.Label(an_frame, text="全区間スペクトル:").grid(row=2, column=0, sticky='w', pady=2)
+        ttk.Combobox(an_frame, textvariable=self.an_full_spectrum_mode, values=["exact", "welch"], state='readonly').grid(row=2, column=1, sticky='we', pady=2)
         an_frame.columnconfigure(1, weight=1)
 
         # --- 下部のボタンフレーム (変更なし) ---
@@ -160,15 +164,19 @@ class ConfigDialog(tk.Toplevel):
                     variable_group=self.fft_variable_group.get(),
                     show_fit_line=self.fft_show_fit_line.get()
                 ),
-                realtime_settings=RealtimeSettingsConfig(
+                realtime_settings=dataclasses.replace(
+                    self.config_data.realtime_settings,
                     video_source=source_index_to_save, # 番号を保存
                     yolo_model_path=self.rt_yolo_path.get(),
                     mediapipe_model_path=self.rt_mediapipe_path.get(),
                     device=self.rt_device.get()
                 ),
-                analysis_parameters=AnalysisParametersConfig(
+                # ダイアログに表示していない項目は現在の設定値を引き継ぐ
+                analysis_parameters=dataclasses.replace(
+                    self.config_data.analysis_parameters,
                     UPDATE_INTERVAL_MS=self.an_update_interval.get(),
-                    SLIDING_WINDOW_SECONDS=self.an_sliding_window.get()
+                    SLIDING_WINDOW_SECONDS=self.an_sliding_window.get(),
+                    FULL_SPECTRUM_MODE=self.an_full_spectrum_mode.get()
                 )
             )
             
@@ -4,10 +4,30 @@ import tkinter as tk
 from tkinter import ttk
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import seaborn as sns
-import pandas as pd
+import numpy as np
+
+# セル数がこれを超えたら数値の表示をやめる (文字が潰れて読めず、描画も重くなるため)
+ANNOTATION_MAX_CELLS = 400
+
+def normalize_columns(values):
+    """
+    列ごとに最小値0・最大値1へ正規化する。値が一定の列とNaNは0にする。
+    (pandasの (df - df.min()) / (df.max() - df.min()) と fillna(0) に相当)
+    """
+    missing = np.isnan(values)
+    mins = np.where(missing, np.inf, values).min(axis=0)
+    maxs = np.where(missing, -np.inf, values).max(axis=0)
+    ranges = maxs - mins
+    valid_columns = np.isfinite(ranges) & (ranges > 0)
+    normalized = np.zeros_like(values)
+    np.divide(values - mins, ranges, out=normalized, where=valid_columns & ~missing)
+    return normalized
 
 class HeatmapView(ttk.Frame):
+    """
+    特徴量のヒートマップ。AxesImageとカラーバーを1つずつ作り置きし、更新時は set_data / set_clim で値だけを差し替える。
+    数値のテキストはセルの位置ごとに使い回し、セル数が ANNOTATION_MAX_CELLS を超えたら表示しない。
+    """
     def __init__(self, parent, controller):
         super().__init__(parent)
         self.controller = controller
@@ -19,41 +39,113 @@ class HeatmapView(ttk.Frame):
         self.canvas = FigureCanvasTkAgg(self.fig, master=self)
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
 
+        self.ax.set_title("特徴量ヒートマップ (全区間)")
+        self.message_text = self.ax.text(0.5, 0.5, "データがありません", ha='center', va='center', fontsize=12, color='gray',
+                                         transform=self.ax.transAxes)
+        self.image = None
+        self.colorbar = None
+        self.annotations = [] # 使い回す数値のテキスト
+        self._labels = None # 表示中の (行ラベル, 列ラベル)。変わったときだけ目盛りとレイアウトを作り直す
+
     def update_plot(self, df_full, df_sliding, full_duration_seconds, sliding_duration_seconds):
         """データを受け取り、ヒートマップを更新する"""
-        self.ax.clear()
-
         # ヒートマップは情報量の多い全区間データのみを対象とする
         df_to_plot = df_full
 
         if df_to_plot is None or df_to_plot.empty:
-            self.ax.text(0.5, 0.5, "データがありません", ha='center', va='center', fontsize=12, color='gray')
-            self.ax.set_title("特徴量ヒートマップ (全区間)")
-            self.canvas.draw()
+            self._show_message("データがありません", color='gray')
+            self.canvas.draw_idle()
             return
 
         try:
             # データを正規化 (0から1の範囲に) してからプロットすると見やすい
-            df_normalized = (df_to_plot - df_to_plot.min()) / (df_to_plot.max() - df_to_plot.min())
-
-            sns.heatmap(
-                df_normalized.fillna(0),
-                ax=self.ax,
-                annot=True,       # 数値を表示
-                fmt=".2f",        # 小数点以下2桁まで
-                cmap='viridis',   # 色のテーマ
-                linewidths=.5
-            )
-            self.ax.set_title("特徴量ヒートマップ (全区間)")
-            self.ax.tick_params(axis='y', labelrotation=0)
+            normalized = normalize_columns(df_to_plot.to_numpy(dtype=float))
+            labels = (tuple(df_to_plot.index), tuple(df_to_plot.columns))
+            self._draw_heatmap(normalized, labels)
 
         except Exception as e:
-            error_msg = f'描画エラー:\n{e}'
-            self.ax.text(0.5, 0.5, error_msg, ha='center', va='center', color='red')
+            self._show_message(f'描画エラー:\n{e}', color='red')
             print(f"ERROR: ヒートマップの描画中にエラーが発生しました: {e}")
 
-        self.fig.tight_layout()
-        self.canvas.draw()
+        self.canvas.draw_idle()
+
+    def _draw_heatmap(self, normalized, labels):
+        """正規化済みの (行 × 列) の値で、画像・カラーバー・数値を更新する"""
+        rows, cols = normalized.shape
+        vmin, vmax = float(normalized.min()), float(normalized.max())
+        if vmin == vmax:
+            vmax = vmin + 1.0 # 全セルが同じ値のときも色の範囲を持たせる
+
+        if self.image is None:
+            self.image = self.ax.imshow(normalized, cmap='viridis', aspect='auto', interpolation='nearest', vmin=vmin, vmax=vmax)
+            self.colorbar = self.fig.colorbar(self.image, ax=self.ax)
+        else:
+            self.image.set_data(normalized)
+            self.image.set_clim(vmin, vmax)
+        self.image.set_visible(True)
+        self.colorbar.ax.set_visible(True)
+        self.message_text.set_visible(False)
+
+        layout_changed = labels != self._labels
+        if layout_changed:
+            self._labels = labels
+            self._set_axes_layout(labels)
+
+        self._update_annotations(normalized, vmin, vmax)
+        if layout_changed:
+            self.fig.tight_layout()
+
+    def _set_axes_layout(self, labels):
+        """行・列のラベルが変わったときに、画像の範囲・目盛り・セルの区切り線を設定し直す"""
+        row_labels, col_labels = labels
+        rows, cols = len(row_labels), len(col_labels)
+        self.image.set_extent((-0.5, cols - 0.5, rows - 0.5, -0.5))
+        self.ax.set_xlim(-0.5, cols - 0.5)
+        self.ax.set_ylim(rows - 0.5, -0.5)
+        self.ax.set_xticks(np.arange(cols), labels=[str(label) for label in col_labels], rotation=90)
+        self.ax.set_yticks(np.arange(rows), labels=[str(label) for label in row_labels], rotation=0)
+        self.ax.set_xticks(np.arange(cols + 1) - 0.5, minor=True)
+        self.ax.set_yticks(np.arange(rows + 1) - 0.5, minor=True)
+        self.ax.grid(which='minor', color='white', linewidth=.5)
+        self.ax.grid(which='major', visible=False)
+        self.ax.tick_params(which='minor', length=0)
+
+        # 数値のテキストをセルの位置に並べ直す (足りない分だけ作る)
+        num_cells = rows * cols if rows * cols <= ANNOTATION_MAX_CELLS else 0
+        while len(self.annotations) < num_cells:
+            self.annotations.append(self.ax.text(0, 0, "", ha='center', va='center', fontsize=8))
+        for index, text in enumerate(self.annotations):
+            if index < num_cells:
+                text.set_position(divmod(index, cols)[::-1])
+            text.set_visible(False)
+
+    def _update_annotations(self, normalized, vmin, vmax):
+        """各セルの数値と文字色 (背景が明るければ黒、暗ければ白) を更新する"""
+        if normalized.size > ANNOTATION_MAX_CELLS:
+            return
+        values = normalized.ravel()
+        is_bright = (values - vmin) / (vmax - vmin) > 0.5 # viridisは値が大きいほど明るい
+        for text, value, bright in zip(self.annotations, values, is_bright):
+            text.set_text(f"{value:.2f}")
+            text.set_color('black' if bright else 'white')
+            text.set_visible(True)
+
+    def _show_message(self, message, color):
+        """ヒートマップを隠してメッセージだけを表示する"""
+        if self.image is not None:
+            self.image.set_visible(False)
+            self.colorbar.ax.set_visible(False)
+        for text in self.annotations:
+            text.set_visible(False)
+        # 前回のヒートマップの目盛りラベルと区切り線も消し、次の描画では目盛りとレイアウトを作り直す
+        self.ax.set_xticks([])
+        self.ax.set_yticks([])
+        self.ax.set_xticks([], minor=True)
+        self.ax.set_yticks([], minor=True)
+        self._labels = None
+        self.message_text.set_text(message)
+        self.message_text.set_color(color)
+        self.message_text.set_visible(True)
 
     def save_plot(self, output_folder, all_data, progress_callback, timestamp, cancel_check):
         """ヒートマップビューの保存処理（現時点では未実装）"""
@@ -62,12 +154,3 @@ class HeatmapView(ttk.Frame):
         # プログレスバーを進めるためにコールバックを呼ぶ
         if progress_callback:
             progress_callback()
-
-
-
-
-
-
-
-
-
@@ -8,6 +8,88 @@ import numpy as np
 from constants import ALL_VARIABLES, EMOTION_VARS, BEHAVIOR_VARS
 import os
 
+class _SpectrumPlot:
+    """
+    1つのAxesに描くスペクトルのグラフ。(ID, 変数) ごとのLine2Dを作り置きし、ティックごとには set_data で値だけを更新する。
+    表示する系列の組み合わせが変わったときだけ線の追加・削除と凡例・レイアウトの再構築を行い、
+    再描画は draw_idle に任せる (Tkのイベントループで1回にまとめられる)。
+    """
+    def __init__(self, fig, ax, canvas):
+        self.fig = fig
+        self.ax = ax
+        self.canvas = canvas
+        self.lines = {} # (ID, 変数) → スペクトルの線
+        self.fit_lines = {} # (ID, 変数) → 近似直線
+        self.signature = None # 表示中の系列の組み合わせ (変わったら凡例とレイアウトを作り直す)
+
+        ax.set_xscale('log')
+        ax.set_yscale('log')
+        ax.set_xlabel("Frequency (log)")
+        ax.set_ylabel("Amplitude (log)")
+        ax.grid(True, which="both", ls="--")
+        self.no_data_text = ax.text(0.5, 0.5, "データがありません", ha='center', va='center', transform=ax.transAxes)
+        self.equation_text = ax.text(0.98, 0.02, "", transform=ax.transAxes, fontsize=8, verticalalignment='bottom', horizontalalignment='right',
+                                     bbox={'boxstyle': 'round', 'facecolor': 'wheat', 'alpha': 0.5}, visible=False)
+
+    def update(self, series, show_fit, title):
+        """series は [(ID, 変数, freq, amp, slope, intercept), ...]"""
+        keys = [(id_name, param_name) for id_name, param_name, *_ in series]
+        fit_keys = [(id_name, param_name) for id_name, param_name, _, _, slope, intercept in series
+                    if show_fit and slope is not None and intercept is not None]
+        signature = (tuple(keys), tuple(fit_keys))
+        if signature != self.signature:
+            self._rebuild(keys, fit_keys)
+
+        equations = []
+        for id_name, param_name, freq, amp, slope, intercept in series:
+            self.lines[(id_name, param_name)].set_data(freq, amp)
+            fit_line = self.fit_lines.get((id_name, param_name))
+            if fit_line is not None:
+                fit_line.set_data(freq, 10**(slope * np.log10(freq) + intercept))
+                equations.append(f"{id_name}_{param_name}: y={slope:.2f}x+{intercept:.2f}")
+
+        self.equation_text.set_text("\n".join(equations))
+        self.equation_text.set_visible(bool(equations))
+        self.no_data_text.set_visible(not series)
+        self.ax.set_title(title)
+        if series:
+            self.ax.relim()
+            self.ax.autoscale_view()
+
+        if signature != self.signature:
+            self.signature = signature
+            self.fig.tight_layout()
+        self.canvas.draw_idle()
+
+    def _rebuild(self, keys, fit_keys):
+        """表示する系列に合わせて線を追加・削除し、凡例を作り直す"""
+        for store, wanted in ((self.lines, set(keys)), (self.fit_lines, set(fit_keys))):
+            for key in [key for key in store if key not in wanted]:
+                store.pop(key).remove()
+
+        # 色はAxesの色の巡回に任せず、系列の並び順で決める (毎回描き直していたときと同じ色で、タブと別ウィンドウでも一致する)
+        colors = plt.rcParams['axes.prop_cycle'].by_key()['color']
+        for index, key in enumerate(keys):
+            color = colors[index % len(colors)]
+            if key not in self.lines:
+                self.lines[key], = self.ax.plot([], [], label=f"{key[0]}_{key[1]}")
+            self.lines[key].set_color(color)
+            if key in self.fit_lines:
+                self.fit_lines[key].set_color(color)
+        for key in fit_keys:
+            if key not in self.fit_lines:
+                self.fit_lines[key], = self.ax.plot([], [], '--', color=self.lines[key].get_color())
+
+        legend = self.ax.get_legend()
+        if legend is not None:
+            legend.remove()
+        if self.lines:
+            self.ax.legend(handles=[self.lines[key] for key in keys], fontsize='small')
+
+    def close(self):
+        plt.close(self.fig)
+
+
 class SpectrumView(ttk.Frame):
     def __init__(self, parent, controller):
         super().__init__(parent)
@@ -64,6 +146,8 @@ class SpectrumView(ttk.Frame):
         self.ax = self.fig.add_subplot(1, 1, 1)
         self.canvas = FigureCanvasTkAgg(self.fig, master=self)
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.plot = _SpectrumPlot(self.fig, self.ax, self.canvas)
+        self.window_plot = None # 別ウィンドウのグラフ
 
     def _open_spectrum_window(self):
         """スペクトルグラフを別ウィンドウで開く"""
@@ -76,10 +160,11 @@ class SpectrumView(ttk.Frame):
         self.spectrum_window.geometry("800x600")
 
         # 新しいウィンドウ用のFigureとCanvasを作成
-        self.fig_new = plt.figure()
-        self.ax_new = self.fig_new.add_subplot(1, 1, 1)
-        self.canvas_new = FigureCanvasTkAgg(self.fig_new, master=self.spectrum_window)
-        self.canvas_new.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        fig_new = plt.figure()
+        ax_new = fig_new.add_subplot(1, 1, 1)
+        canvas_new = FigureCanvasTkAgg(fig_new, master=self.spectrum_window)
+        canvas_new.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.window_plot = _SpectrumPlot(fig_new, ax_new, canvas_new)
 
         # ウィンドウが閉じられたときの処理
         self.spectrum_window.protocol("WM_DELETE_WINDOW", self._on_spectrum_window_close)
@@ -93,62 +178,46 @@ class SpectrumView(ttk.Frame):
             self.spectrum_window.destroy()
             self.spectrum_window = None
             # MatplotlibのFigureリソースも解放
-            plt.close(self.fig_new)
+            self.window_plot.close()
+            self.window_plot = None
 
-    def _draw_spectrum_on_ax(self, ax, power_spectrums):
-        """指定されたAxesオブジェクトにグラフを描画する共通ヘルパー"""
-        ax.clear()
+    @property
+    def time_range_key(self):
+        """表示するスペクトルの範囲 ('sliding' / 'full')"""
+        return 'sliding' if self.controller.app.time_range_var.get() == "30秒窓" else 'full'
 
-        selected_params = [name for name, var in self.param_vars.items() if var.get()]
-        time_range_key = 'sliding' if self.controller.app.time_range_var.get() == "30秒窓" else 'full'
-
-        if power_spectrums:
-            spectrum_data = power_spectrums.get(time_range_key, {})
-            equations = []
-            ids_to_plot = spectrum_data.keys()
-
-            for id_name in ids_to_plot:
-                for param_name in selected_params:
-                    if id_name in spectrum_data and param_name in spectrum_data.get(id_name, {}):
-                        freq, amp, slope, intercept = spectrum_data[id_name][param_name]
-                        if freq is None or len(freq) == 0: continue
-
-                        line, = ax.loglog(freq, amp, label=f"{id_name}_{param_name}")
-
-                        if self.show_fit_var.get() and slope is not None and intercept is not None:
-                            line_color = line.get_color()
-                            log_freq = np.log10(freq)
-                            fit_line = 10**(slope * log_freq + intercept)
-                            ax.loglog(freq, fit_line, '--', color=line_color)
-                            equations.append(f"{id_name}_{param_name}: y={slope:.2f}x+{intercept:.2f}")
-
-            if ax.has_data():
-                ax.legend(fontsize='small')
-                if self.show_fit_var.get() and equations:
-                    ax.text(0.98, 0.02, "\n".join(equations), transform=ax.transAxes, fontsize=8, verticalalignment='bottom', horizontalalignment='right', bbox={'boxstyle': 'round', 'facecolor': 'wheat', 'alpha': 0.5})
-            ax.grid(True, which="both", ls="--")
-        else:
-            ax.text(0.5, 0.5, "データがありません", ha='center', va='center')
+    def _collect_series(self, power_spectrums):
+        """選択中の (ID, 変数) のうち、スペクトルがあるものを [(ID, 変数, freq, amp, slope, intercept), ...] で返す"""
+        if not power_spectrums:
+            return []
 
-        title = f"パワースペクトル ({self.controller.app.time_range_var.get()})"
-        ax.set_title(title)
-        ax.set_xlabel("Frequency (log)")
-        ax.set_ylabel("Amplitude (log)")
+        selected_params = [name for name, var in self.param_vars.items() if var.get()]
+        spectrum_data = power_spectrums.get(self.time_range_key, {})
+
+        series = []
+        for id_name, id_spectrums in spectrum_data.items():
+            for param_name in selected_params:
+                if param_name not in id_spectrums:
+                    continue
+                freq, amp, slope, intercept = id_spectrums[param_name]
+                if freq is None or len(freq) == 0: continue
+                series.append((id_name, param_name, freq, amp, slope, intercept))
+        return series
 
     def update_plot(self, power_spectrums=None):
         if power_spectrums is None:
             power_spectrums = self.controller.model.last_power_spectrums
 
-        # メインウィンドウのタブ内グラフを描画
-        self._draw_spectrum_on_ax(self.ax, power_spectrums)
-        self.fig.tight_layout()
-        self.canvas.draw()
+        series = self._collect_series(power_spectrums)
+        show_fit = self.show_fit_var.get()
+        title = f"パワースペクトル ({self.controller.app.time_range_var.get()})"
+
+        # メインウィンドウのタブ内グラフを更新
+        self.plot.update(series, show_fit, title)
 
         # 別ウィンドウが開いていれば、そちらも更新
-        if self.spectrum_window and self.spectrum_window.winfo_exists():
-            self._draw_spectrum_on_ax(self.ax_new, power_spectrums)
-            self.fig_new.tight_layout()
-            self.canvas_new.draw()
+        if self.window_plot and self.spectrum_window and self.spectrum_window.winfo_exists():
+            self.window_plot.update(series, show_fit, title)
 
     def _trigger_update(self):
         """UI操作をコントローラーに通知する"""
@@ -1,34 +1,85 @@
 # app/views/video_view.py
 
+import time
 import tkinter as tk
+from collections import deque
 from tkinter import ttk
 from PIL import Image, ImageTk
 import numpy as np
 
 class VideoView(ttk.Frame):
+    """
+    映像処理プロセスのフレームを表示するビュー。
+
+    フレームはラベルの大きさに合わせて一度だけ縮小し (拡大はしない)、
+    同じ大きさの間は1つのPhotoImageに paste して使い回す。
+    表示の更新は display_max_fps を上限に間引き、実際の表示FPSを画面下部に表示する。
+    """
     def __init__(self, parent, controller):
         super().__init__(parent)
         self.controller = controller
-        
+
         self.video_label = ttk.Label(self)
         self.video_label.pack(fill=tk.BOTH, expand=True)
+        self.fps_var = tk.StringVar(value="")
+        ttk.Label(self, textvariable=self.fps_var, anchor='e').pack(side=tk.BOTTOM, fill=tk.X)
+
+        self.imgtk = None # 使い回すPhotoImage
+        self._display_times = deque(maxlen=60)
+        self._last_display = 0.0
+        self._last_fps_report = 0.0
 
     def update_frame(self, frame_bgr):
         """
         OpenCVのフレーム(BGR形式)を受け取り、画面に表示する。
+        前回の表示から 1 / display_max_fps 秒経っていなければ何もしない。
         """
         if frame_bgr is None:
             return
-            
-        # BGRからRGBに変換
-        frame_rgb = frame_bgr[:, :, ::-1]
-        
-        # PIL Imageに変換
-        pil_image = Image.fromarray(frame_rgb)
-        
-        # Tkinterで表示できる形式に変換
-        imgtk = ImageTk.PhotoImage(image=pil_image)
-        
-        # ラベルに画像を設定
-        self.video_label.imgtk = imgtk
-        self.video_label.configure(image=imgtk)
\ No newline at end of file
+
+        now = time.perf_counter()
+        max_fps = self.controller.config_manager.config.realtime_settings.display_max_fps
+        if max_fps > 0 and now - self._last_display < 1.0 / max_fps:
+            return
+        self._last_display = now
+
+        # BGRのバイト列をそのままPILに読み込ませ、読み込み時にRGBへ並べ替える (numpyでの反転コピーをしない)
+        frame_height, frame_width = frame_bgr.shape[:2]
+        pil_image = Image.frombuffer("RGB", (frame_width, frame_height), np.ascontiguousarray(frame_bgr), "raw", "BGR", 0, 1)
+
+        # ラベルの大きさに収まるよう縮小する (縦横比は保つ)
+        target_size = self._fit_size(frame_width, frame_height)
+        if target_size != (frame_width, frame_height):
+            pil_image = pil_image.resize(target_size, Image.BILINEAR, reducing_gap=2.0)
+
+        # 大きさが変わったときだけPhotoImageを作り直し、それ以外は中身だけを書き換える
+        if self.imgtk is None or (self.imgtk.width(), self.imgtk.height()) != target_size:
+            self.imgtk = ImageTk.PhotoImage(image=pil_image)
+            self.video_label.configure(image=self.imgtk)
+        else:
+            self.imgtk.paste(pil_image)
+
+        self._display_times.append(now)
+        self._report_fps(now)
+
+    def _fit_size(self, frame_width, frame_height):
+        """フレームをラベルに収めるときの大きさ。ラベルがまだ配置されていなければ元の大きさ"""
+        label_width, label_height = self.video_label.winfo_width(), self.video_label.winfo_height()
+        if label_width <= 1 or label_height <= 1:
+            return frame_width, frame_height
+        scale = min(label_width / frame_width, label_height / frame_height, 1.0)
+        return max(1, int(frame_width * scale)), max(1, int(frame_height * scale))
+
+    @property
+    def display_fps(self):
+        """直近の表示レート"""
+        if len(self._display_times) < 2:
+            return 0.0
+        elapsed = self._display_times[-1] - self._display_times[0]
+        return (len(self._display_times) - 1) / elapsed if elapsed > 0 else 0.0
+
+    def _report_fps(self, now):
+        """表示FPSの表示を1秒ごとに更新する"""
+        if now - self._last_fps_report >= 1.0:
+            self._last_fps_report = now
+            self.fps_var.set(f"表示 {self.display_fps:.1f} FPS")
@@ -0,0 +1,112 @@
+# ファイル名: batch_cli.py (新規作成)
+"""
+GUIを使わずに、CSVセッションを一括解析するコマンドラインツール。
+
+1つのディレクトリ (またはglobに一致したファイルを含むディレクトリ) を1セッションとし、
+その中の ID_*.csv を結合して全区間の特徴量を計算する。
+結果はセッションごとのフォルダに、GUIの保存と同じ形式の
+features.csv / slopes_and_intercepts.csv として書き出す。
+
+使用例:
+    python batch_cli.py data/session_* -o results --workers 4
+    python batch_cli.py "data/**/ID_*.csv" -o results
+"""
+
+import argparse
+import glob
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from core import data_loader
+from core.data_processor import DataProcessor
+from core.history_store import HistoryStore
+from core.result_writer import write_results
+
+def find_sessions(inputs):
+    """ディレクトリまたはglobの指定から {セッション名: CSVファイルのリスト} を作る"""
+    files_by_dir = {}
+    for pattern in inputs:
+        # シェルがglobを展開しない場合 (Windowsのcmdや引用符で囲んだ場合) も、ここで展開してから振り分ける
+        candidates = [pattern] if os.path.isdir(pattern) else glob.glob(pattern, recursive=True)
+        matched = []
+        for candidate in candidates:
+            if os.path.isdir(candidate):
+                matched.extend(glob.glob(os.path.join(candidate, "ID_*.csv")))
+            elif candidate.lower().endswith(".csv"):
+                matched.append(candidate)
+        for path in sorted(os.path.abspath(path) for path in matched):
+            filepaths = files_by_dir.setdefault(os.path.dirname(path), [])
+            if path not in filepaths:
+                filepaths.append(path)
+
+    sessions = {}
+    for directory, filepaths in files_by_dir.items():
+        name = os.path.basename(directory) or "session"
+        unique_name, suffix = name, 2
+        while unique_name in sessions:
+            unique_name, suffix = f"{name}_{suffix}", suffix + 1
+        sessions[unique_name] = filepaths
+    return sessions
+
+def analyze_session(name, filepaths, output_dir):
+    """【ワーカープロセスで実行】1セッション分のCSVを読み込み、特徴量を計算して保存する"""
+    started = time.perf_counter()
+    df, active_ids = data_loader.load_csvs(filepaths)
+    if df is None:
+        return {'name': name, 'error': "読み込めるCSVがありませんでした。", 'rows': 0, 'ids': 0, 'seconds': time.perf_counter() - started}
+
+    history = HistoryStore.from_dataframe(df, active_ids)
+    df_features, power_spectrums = DataProcessor().get_features_from_history(history, active_ids)
+    write_results(os.path.join(output_dir, name), df_features, power_spectrums)
+    return {'name': name, 'error': None, 'rows': len(df), 'ids': len(active_ids), 'seconds': time.perf_counter() - started}
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="CSVセッションをGUIなしで一括解析し、特徴量と傾き・切片をCSVに保存します。")
+    parser.add_argument("inputs", nargs="+", help="ID_*.csv を含むディレクトリ、またはCSVファイルのglobパターン")
+    parser.add_argument("-o", "--output", default="batch_results", help="結果を保存する親フォルダ (既定: batch_results)")
+    parser.add_argument("-w", "--workers", type=int, default=0, help="同時に処理するセッション数 (0ならCPUコア数)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    sessions = find_sessions(args.inputs)
+    if not sessions:
+        print("ERROR: 解析対象のCSVが見つかりませんでした。", file=sys.stderr)
+        return 1
+
+    workers = min(args.workers or os.cpu_count() or 1, len(sessions))
+    print(f"INFO: {len(sessions)}セッションを {workers}プロセスで解析します。出力先: {args.output}")
+    os.makedirs(args.output, exist_ok=True)
+
+    started = time.perf_counter()
+    total_rows, failures = 0, 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(analyze_session, name, filepaths, args.output): name for name, filepaths in sessions.items()}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {'name': name, 'error': str(e), 'rows': 0, 'ids': 0, 'seconds': 0.0}
+
+            if result['error']:
+                failures += 1
+                print(f"ERROR: {name}: {result['error']}", file=sys.stderr)
+            else:
+                total_rows += result['rows']
+                print(f"INFO: {name}: {result['ids']}ID × {result['rows']}行 ({result['seconds']:.2f}秒)")
+
+    elapsed = time.perf_counter() - started
+    succeeded = len(sessions) - failures
+    print(
+        f"INFO: 完了 {succeeded}/{len(sessions)}セッション, {elapsed:.2f}秒 "
+        f"({succeeded / elapsed:.2f}セッション/秒, {total_rows / elapsed:.0f}行/秒)"
+    )
+    return 0 if failures == 0 else 1
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    sys.exit(main())
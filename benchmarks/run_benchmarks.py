@@ -0,0 +1,203 @@
+# ファイル名: benchmarks/run_benchmarks.py (新規作成)
+"""
+解析コアのベンチマーク。リポジトリのルートから実行する。
+
+    python -m benchmarks.run_benchmarks --ids 4 16 --samples 1000 10000 -o bench.json
+    python -m benchmarks.run_benchmarks --compare bench_baseline.json
+
+結果はJSONで保存し、--compare で基準の結果と比較する。
+基準より threshold 以上遅くなったシナリオがあれば終了コード1を返す。
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic_data import make_id_names, make_packets, make_time_series_df, write_session_csvs
+from core import data_loader
+from core.analysis_service import AnalysisService
+from core.config_manager import AnalysisParametersConfig
+from core.data_processor import DataProcessor
+from core.history_store import HistoryStore
+from core.model import AnalysisModel
+
+def measure(func, repeat, setup=None):
+    """funcをrepeat回実行し、各回の経過秒数のリストを返す (setupの時間は含めない)"""
+    timings = []
+    for _ in range(repeat):
+        state = setup() if setup else None
+        started = time.perf_counter()
+        func(state)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+def make_service(df, active_ids, params):
+    """合成データを読み込んだ状態のAnalysisServiceを作る"""
+    model = AnalysisModel()
+    model.active_ids = active_ids
+    model.full_history = HistoryStore.from_dataframe(df, active_ids)
+    return AnalysisService(model, DataProcessor(), params)
+
+def scenario_calculate_slope(df, active_ids, params, repeat):
+    """1列分の calculate_slope"""
+    values = df.iloc[:, 0].dropna().to_numpy()
+    processor = DataProcessor()
+    return measure(lambda _: processor.calculate_slope(values), repeat)
+
+def scenario_get_features_from_df(df, active_ids, params, repeat):
+    """DataFrameからの全ID・全変数の特徴量計算"""
+    processor = DataProcessor()
+    return measure(lambda _: processor.get_features_from_df(df, active_ids), repeat)
+
+def scenario_convert_history_to_df(df, active_ids, params, repeat):
+    """パケットのリスト (従来形式のhistory) からDataFrameへの変換"""
+    packets = make_packets(df, active_ids)
+    processor = DataProcessor()
+    return measure(lambda _: processor.convert_history_to_df(packets, active_ids), repeat)
+
+def scenario_realtime_tick(df, active_ids, params, repeat):
+    """リアルタイム再生の1ティック (1サンプル追記 + 最新位置の特徴量計算)"""
+    window = params.SLIDING_WINDOW_SECONDS
+    half = len(df) // 2
+    source = HistoryStore.from_dataframe(df, active_ids)
+    service = make_service(df.iloc[:half], active_ids, params)
+    history = service.model.full_history
+    position = [half]
+
+    def tick(_):
+        index = position[0] % len(source)
+        history.append(source[index])
+        length = len(history)
+        service.process_and_store_features(history[:length], history[max(0, length - window):length])
+        position[0] += 1
+
+    tick(None) # 逐次推定器の初期化分は計測に含めない
+    return measure(tick, repeat)
+
+def scenario_slider_scrub(df, active_ids, params, repeat):
+    """スライダーでランダムな位置へ移動したときの特徴量計算 (タイムライン・キャッシュなし)"""
+    window = params.SLIDING_WINDOW_SECONDS
+    service = make_service(df, active_ids, params)
+    history = service.model.full_history
+    rng = np.random.default_rng(0)
+
+    def setup():
+        service.feature_cache.clear()
+        return int(rng.integers(window, len(history)))
+
+    def scrub(index):
+        service.process_and_store_features(history[:index + 1], history[max(0, index - window + 1):index + 1])
+
+    return measure(scrub, repeat, setup)
+
+def scenario_batch_analysis(df, active_ids, params, repeat):
+    """一括解析 (DataFrame → history → 全区間の特徴量)"""
+    service = make_service(df.iloc[:0], active_ids, params)
+    return measure(lambda _: service.perform_batch_analysis(df), repeat)
+
+def scenario_csv_load(df, active_ids, params, repeat):
+    """IDごとのCSVファイルの読み込みと結合 (data_loader.load_csvs)"""
+    with tempfile.TemporaryDirectory() as directory:
+        filepaths = write_session_csvs(df, active_ids, directory)
+        return measure(lambda _: data_loader.load_csvs(filepaths), repeat)
+
+SCENARIOS = {
+    'calculate_slope': scenario_calculate_slope,
+    'get_features_from_df': scenario_get_features_from_df,
+    'convert_history_to_df': scenario_convert_history_to_df,
+    'realtime_tick': scenario_realtime_tick,
+    'slider_scrub': scenario_slider_scrub,
+    'batch_analysis': scenario_batch_analysis,
+    'csv_load': scenario_csv_load,
+}
+
+def run(args):
+    """全ての (シナリオ × ID数 × サンプル数) を実行し、結果の辞書を返す"""
+    params = AnalysisParametersConfig(BATCH_WORKERS=args.batch_workers)
+    results = {}
+    for num_ids in args.ids:
+        for num_samples in args.samples:
+            df = make_time_series_df(num_ids, num_samples, nan_density=args.nan_density, seed=args.seed)
+            active_ids = make_id_names(num_ids)
+            for name in args.scenarios:
+                key = f"{name}[ids={num_ids},samples={num_samples}]"
+                timings = SCENARIOS[name](df, active_ids, params, args.repeat)
+                results[key] = {
+                    'median_s': statistics.median(timings),
+                    'min_s': min(timings),
+                    'max_s': max(timings),
+                    'repeat': len(timings),
+                }
+                print(f"{key:<60} median {results[key]['median_s'] * 1000:10.3f} ms  min {results[key]['min_s'] * 1000:10.3f} ms")
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'nan_density': args.nan_density,
+            'seed': args.seed,
+            'repeat': args.repeat,
+            'batch_workers': args.batch_workers,
+        },
+        'results': results,
+    }
+
+def compare(current, baseline, threshold):
+    """基準と比較して差分を表示し、threshold (割合) を超えて遅くなったシナリオのリストを返す"""
+    regressions = []
+    print(f"\n{'scenario':<60} {'baseline':>12} {'current':>12} {'change':>8}")
+    for key, result in current['results'].items():
+        base = baseline.get('results', {}).get(key)
+        if base is None:
+            print(f"{key:<60} {'-':>12} {result['median_s'] * 1000:10.3f}ms {'new':>8}")
+            continue
+        change = result['median_s'] / base['median_s'] - 1 if base['median_s'] > 0 else 0.0
+        marker = " <-- REGRESSION" if change > threshold else ""
+        print(f"{key:<60} {base['median_s'] * 1000:10.3f}ms {result['median_s'] * 1000:10.3f}ms {change:+8.1%}{marker}")
+        if change > threshold:
+            regressions.append(key)
+    return regressions
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="解析コアのベンチマークを合成データで実行します。")
+    parser.add_argument("--ids", type=int, nargs="+", default=[4, 16], help="ID数 (複数指定可)")
+    parser.add_argument("--samples", type=int, nargs="+", default=[1000, 10000], help="サンプル数 (複数指定可)")
+    parser.add_argument("--nan-density", type=float, default=0.01, help="NaNにする値の割合")
+    parser.add_argument("--repeat", type=int, default=5, help="各シナリオの繰り返し回数")
+    parser.add_argument("--seed", type=int, default=0, help="合成データの乱数シード")
+    parser.add_argument("--batch-workers", type=int, default=1, help="一括解析シナリオのプロセス数 (BATCH_WORKERS)")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS), help="実行するシナリオ")
+    parser.add_argument("-o", "--output", help="結果を保存するJSONファイル")
+    parser.add_argument("--compare", help="比較する基準のJSONファイル")
+    parser.add_argument("--threshold", type=float, default=0.2, help="回帰とみなす中央値の悪化率 (既定: 0.2 = 20%%)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    current = run(args)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2)
+        print(f"INFO: 結果を '{args.output}' に保存しました。")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f"ERROR: {len(regressions)}件のシナリオが基準より {args.threshold:.0%} 以上遅くなりました。", file=sys.stderr)
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,52 @@
+# ファイル名: benchmarks/synthetic_data.py (新規作成)
+
+import os
+import numpy as np
+import pandas as pd
+from constants import ALL_VARIABLES
+
+def make_id_names(num_ids):
+    """ID_1, ID_2, ... のID名リストを返す"""
+    return [f"ID_{i}" for i in range(1, num_ids + 1)]
+
+def make_time_series_df(num_ids, num_samples, nan_density=0.0, seed=0):
+    """
+    data_loader.load_csvs の結果と同じ形式 ('{ID}_{変数名}' 列、インデックスが 'timestamp') の
+    合成データを作る。値はランダムウォークにノイズを重ねたもので、nan_densityの割合でNaNにする。
+    """
+    rng = np.random.default_rng(seed)
+    num_columns = num_ids * len(ALL_VARIABLES)
+    values = np.cumsum(rng.normal(scale=0.1, size=(num_samples, num_columns)), axis=0)
+    values += rng.normal(scale=0.5, size=values.shape)
+    if nan_density > 0:
+        values[rng.random(values.shape) < nan_density] = np.nan
+
+    columns = [f"{id_name}_{var}" for id_name in make_id_names(num_ids) for var in ALL_VARIABLES]
+    df = pd.DataFrame(values, columns=columns)
+    df.index.name = 'timestamp'
+    return df
+
+def make_packets(df, active_ids):
+    """DataFrameを従来形式のパケット ({'timestamp': t, 'ID_1': {var: value}}) のリストに変換する"""
+    packets = []
+    for timestamp, row in zip(df.index, df.to_numpy()):
+        packet = {'timestamp': timestamp}
+        for id_index, id_name in enumerate(active_ids):
+            id_values = row[id_index * len(ALL_VARIABLES):(id_index + 1) * len(ALL_VARIABLES)]
+            id_data = {var: value for var, value in zip(ALL_VARIABLES, id_values) if not np.isnan(value)}
+            if id_data:
+                packet[id_name] = id_data
+        packets.append(packet)
+    return packets
+
+def write_session_csvs(df, active_ids, directory):
+    """IDごとのCSV (ID_*.csv) としてディレクトリに書き出し、ファイルパスのリストを返す"""
+    os.makedirs(directory, exist_ok=True)
+    filepaths = []
+    for id_name in active_ids:
+        id_df = df[[f"{id_name}_{var}" for var in ALL_VARIABLES]]
+        id_df.columns = ALL_VARIABLES
+        filepath = os.path.join(directory, f"{id_name}.csv")
+        id_df.to_csv(filepath, index=False)
+        filepaths.append(filepath)
+    return filepaths
@@ -1,49 +1,218 @@
 # ファイル名: core/analysis_service.py (新規作成)
 
+import threading
+
 import pandas as pd
+from core.config_manager import AnalysisParametersConfig
+from core.history_store import HistoryStore
+from core.feature_cache import FeatureCache
+from core.batch_executor import ShardedBatchExecutor
+from core.feature_timeline import FeatureTimeline, LazyPowerSpectrums
+from core.spectrum_estimators import SlidingSpectrumEstimator, WelchSpectrumAccumulator
 
 class AnalysisService:
     """
     データ処理と解析の実行を専門に担当するサービスクラス。
     Controllerからビジネスロジックを分離する。
     """
-    def __init__(self, model, data_processor):
+    def __init__(self, model, data_processor, analysis_params=None):
         self.model = model
         self.data_processor = data_processor
+        # 逐次推定器・キャッシュは1スレッドずつしか更新できないため、計算全体を排他する
+        self._compute_lock = threading.RLock()
+        self.update_parameters(analysis_params or AnalysisParametersConfig())
+
+    def update_parameters(self, analysis_params):
+        """解析パラメータを反映し、スペクトル推定器を作り直す"""
+        with self._compute_lock:
+            self._update_parameters(analysis_params)
+
+    def _update_parameters(self, analysis_params):
+        if hasattr(self, 'timeline'):
+            self.timeline.invalidate()
+        self.analysis_params = analysis_params
+        self.feature_cache = FeatureCache(max_bytes=analysis_params.FEATURE_CACHE_MAX_MB * 1024 * 1024)
+        self.timeline = FeatureTimeline(
+            self,
+            stride=analysis_params.TIMELINE_STRIDE,
+            max_points=analysis_params.TIMELINE_MAX_POINTS,
+            workers=analysis_params.TIMELINE_WORKERS
+        )
+        self.sliding_estimator = SlidingSpectrumEstimator(
+            self.data_processor,
+            window=analysis_params.SLIDING_WINDOW_SECONDS,
+            resync_interval=analysis_params.SLIDING_DFT_RESYNC_INTERVAL
+        )
+        self.welch_accumulator = self.create_welch_accumulator()
+        self._estimator_history = None # 推定器が追従しているhistoryオブジェクト
+
+    def create_welch_accumulator(self):
+        """現在の設定でWelch法の推定器を作成する"""
+        return WelchSpectrumAccumulator(self.data_processor, segment_length=self.analysis_params.WELCH_SEGMENT_LENGTH)
+
+    @property
+    def uses_welch_full_spectrum(self):
+        """全区間スペクトルをWelch法で逐次推定する設定かどうか"""
+        return self.analysis_params.FULL_SPECTRUM_MODE == "welch"
+
+    def reset(self):
+        """全データのリセット時に、事前計算済み・キャッシュ済みの結果を破棄する"""
+        with self._compute_lock:
+            self.timeline.invalidate()
+            self.feature_cache.clear()
+
+    def build_timeline(self):
+        """現在のhistoryに対するスライダー用タイムラインを、バックグラウンドで構築する"""
+        self.timeline.build_async(self.model.full_history, self.model.active_ids, self.sliding_estimator.window)
 
     def process_and_store_features(self, full_slice, sliding_slice=None):
         """
         特徴量を計算し、結果をモデルに格納する。
         (Controllerからロジックを移動)
+        スペクトルが参照時に遅延計算される場合 (タイムラインから傾きを取得した場合など) は ps_full に None を返す。
         """
-        # --- 全区間データの計算 ---
-        df_full = self.data_processor.convert_history_to_df(full_slice, self.model.active_ids)
-        df_full_features, ps_full = self.data_processor.get_features_from_df(df_full, self.model.active_ids)
+        slope_dfs, power_spectrums = self.compute_features(full_slice, sliding_slice)
 
-        # --- スライディング窓データの計算 ---
-        df_sliding_features, ps_sliding = pd.DataFrame(), {}
-        if sliding_slice:
-            df_sliding = self.data_processor.convert_history_to_df(sliding_slice, self.model.active_ids)
-            df_sliding_features, ps_sliding = self.data_processor.get_features_from_df(df_sliding, self.model.active_ids)
-            
         # --- 計算結果をModelに保存 ---
-        self.model.last_slope_dfs = {'sliding': df_sliding_features, 'full': df_full_features}
-        self.model.last_power_spectrums = {'sliding': ps_sliding, 'full': ps_full}
-        
+        self.model.set_features(slope_dfs, power_spectrums)
+
         # --- 一括解析用に計算結果を返す ---
-        return df_full_features, ps_full
+        ps_full = None if isinstance(power_spectrums, LazyPowerSpectrums) else power_spectrums['full']
+        return slope_dfs['full'], ps_full
+
+    def compute_features(self, full_slice, sliding_slice=None, history=None, active_ids=None):
+        """
+        historyの区間に対する ({'sliding', 'full'} の傾き, 同スペクトル) を返す。
+        キャッシュ → 事前計算済みのタイムライン → 計算 の順に参照する。
+        返した値はキャッシュと共有されるため、呼び出し側で変更しないこと。
 
-    def perform_batch_analysis(self, all_data_history):
+        UIスレッド・計算スレッドのどちらから呼んでもよい。計算スレッドから呼ぶ場合は、
+        依頼時点の history (ストア) と tuple(active_ids) を渡すこと (省略時はモデルの現在の値)。
+        逐次推定器は full_slice (依頼時点のID軸・行数で固定されたビュー) だけを読むため、
+        計算中にUIスレッドが行やIDを追加しても影響を受けない。
+        """
+        history = self.model.full_history if history is None else history
+        active_ids = tuple(self.model.active_ids if active_ids is None else active_ids)
+        with self._compute_lock:
+            return self._compute_features(full_slice, sliding_slice, history, active_ids)
+
+    def _compute_features(self, full_slice, sliding_slice, history, active_ids):
+        self._sync_estimators_with_history(history)
+        window = self.sliding_estimator.window
+
+        # 通常の窓 (スライダー位置から窓長分さかのぼった区間) のときだけ、キャッシュ・タイムラインを使う
+        is_standard_window = bool(sliding_slice) and len(sliding_slice) == min(len(full_slice), window)
+        cache_key = self._cache_key(len(full_slice) - 1, active_ids) if is_standard_window else None
+        if cache_key is not None:
+            cached = self.feature_cache.get(history, cache_key)
+            if cached is not None:
+                return cached
+
+        result = None
+        if is_standard_window:
+            timeline_dfs = self.timeline.lookup(history, len(full_slice) - 1, active_ids, window)
+            if timeline_dfs is not None:
+                result = (timeline_dfs, LazyPowerSpectrums({
+                    'sliding': lambda: self._load_spectrum(self.data_processor.get_features_from_history, sliding_slice, active_ids),
+                    'full': lambda: self._load_spectrum(self._compute_full_features, full_slice, active_ids, history)
+                }))
+
+        if result is None:
+            # --- 全区間データの計算 ---
+            df_full_features, ps_full = self._compute_full_features(full_slice, active_ids, history)
+
+            # --- スライディング窓データの計算 ---
+            df_sliding_features, ps_sliding = pd.DataFrame(), {}
+            if sliding_slice:
+                df_sliding_features, ps_sliding = self._compute_sliding_features(full_slice, sliding_slice, active_ids)
+
+            result = (
+                {'sliding': df_sliding_features, 'full': df_full_features},
+                {'sliding': ps_sliding, 'full': ps_full}
+            )
+
+        if cache_key is not None:
+            self.feature_cache.put(history, cache_key, result)
+        return result
+
+    def _load_spectrum(self, compute, *args):
+        """LazyPowerSpectrumsから呼ばれるスペクトルの遅延計算 (参照したスレッドで実行されるため、計算スレッドと排他する)"""
+        with self._compute_lock:
+            return compute(*args)[1]
+
+    def materialize_spectrums(self, power_spectrums, keys):
+        """遅延計算のスペクトルのうち keys を計算しておく (計算スレッドで呼び、UIスレッドでの計算を避ける)"""
+        if isinstance(power_spectrums, LazyPowerSpectrums):
+            for key in keys:
+                power_spectrums[key]
+
+    def _cache_key(self, index, active_ids):
+        """キャッシュのキー (historyの位置, 窓長, 推定方法の設定, 対象ID)"""
+        params = self.analysis_params
+        estimator_settings = (params.FULL_SPECTRUM_MODE, params.WELCH_SEGMENT_LENGTH)
+        return (index, self.sliding_estimator.window, estimator_settings, tuple(active_ids))
+
+    def _compute_full_features(self, full_slice, active_ids, history):
+        """全区間の特徴量を、設定された方法 (厳密なFFT / Welch法) で計算する"""
+        if self.uses_welch_full_spectrum:
+            return self._compute_welch_full_features(full_slice, active_ids, history)
+        return self.data_processor.get_features_from_history(full_slice, active_ids)
+
+    def _sync_estimators_with_history(self, history):
+        """historyが作り直された (解析の開始やリセット) 場合は、逐次推定器も初期化する"""
+        if self._estimator_history is not history:
+            self.sliding_estimator.reset()
+            self.welch_accumulator.reset()
+            self._estimator_history = history
+
+    def _compute_welch_full_features(self, full_slice, active_ids, history):
+        """
+        全区間の特徴量をWelch法で計算する。
+        最新位置へ進む場合は差分だけを取り込み、過去に戻った場合や別のhistoryの場合はその位置まで推定し直す。
+        """
+        accumulator = self.welch_accumulator
+        if history is not self._estimator_history or len(full_slice) < accumulator.samples_seen:
+            accumulator = self.create_welch_accumulator()
+        accumulator.advance(full_slice, len(full_slice))
+        return accumulator.get_features(active_ids)
+
+    def _compute_sliding_features(self, full_slice, sliding_slice, active_ids):
+        """
+        スライディング窓の特徴量を計算する。
+        窓がhistoryの先頭側へ進むだけの場合は、スライディングDFTで差分更新する。
+        """
+        estimator = self.sliding_estimator
+        end_index = len(full_slice)
+        is_forward = estimator.samples_seen <= end_index
+        if is_forward and len(sliding_slice) == min(end_index, estimator.window):
+            estimator.advance(full_slice, end_index)
+            return estimator.get_features(active_ids)
+
+        # スライダーで過去に戻った場合などは、窓を直接計算する
+        return self.data_processor.get_features_from_history(sliding_slice, active_ids)
+
+    def perform_batch_analysis(self, time_series_df):
         """
         一括解析の重い計算処理を実行する。
         (Controllerの別スレッド処理からロジックを移動)
+        CSVのDataFrameを列単位でhistoryに変換し、パケットは再生時に参照されたときだけ組み立てる。
         """
-        df_full = self.data_processor.convert_history_to_df(all_data_history, self.model.active_ids)
-        df_full_features, ps_full = self.data_processor.get_features_from_df(df_full, self.model.active_ids)
-        
+        history = HistoryStore.from_dataframe(time_series_df, self.model.active_ids)
+        df_full_features, ps_full = self._compute_batch_features(history)
+
         # --- Modelに再生用・保存用データを格納 ---
-        self.model.full_history = all_data_history
-        self.model.last_slope_dfs = {'full': df_full_features, 'sliding': pd.DataFrame()}
-        self.model.last_power_spectrums = {'full': ps_full, 'sliding': {}}
-        
-        return df_full_features
\ No newline at end of file
+        self.model.full_history = history
+        self.model.set_features({'full': df_full_features, 'sliding': pd.DataFrame()}, {'full': ps_full, 'sliding': {}})
+
+        return df_full_features
+
+    def _compute_batch_features(self, history):
+        """一括解析の全区間特徴量を、IDごとに分割してプロセスプールで並列計算する"""
+        active_ids = self.model.active_ids
+        if not history or not active_ids:
+            return pd.DataFrame(), {}
+
+        columns, matrix = history.columns_for(active_ids)
+        executor = ShardedBatchExecutor(self.data_processor, workers=self.analysis_params.BATCH_WORKERS)
+        slopes, spectrums = executor.compute_columns(matrix, columns)
+        return self.data_processor.build_features(active_ids, slopes, spectrums)
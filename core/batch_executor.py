@@ -0,0 +1,82 @@
+# ファイル名: core/batch_executor.py (新規作成)
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+from core.data_processor import DataProcessor
+
+def _compute_shard(input_name, input_shape, output_name, output_rows, start, stop):
+    """
+    【ワーカープロセスで実行】共有メモリ上の (時間 × 列) 配列のうち [start, stop) 列を計算する。
+    振幅は共有メモリ上の出力配列へ直接書き込み、列ごとの小さな配列だけを返す。
+    """
+    input_shm = shared_memory.SharedMemory(name=input_name)
+    output_shm = shared_memory.SharedMemory(name=output_name)
+    try:
+        matrix = np.ndarray(input_shape, dtype=float, buffer=input_shm.buf)
+        amplitude = np.ndarray((output_rows, input_shape[1]), dtype=float, buffer=output_shm.buf)
+        counts, slopes, intercepts, valid, _ = DataProcessor().compute_column_arrays(matrix[:, start:stop], amplitude[:, start:stop])
+        del matrix, amplitude # 共有メモリを閉じる前に参照を外す
+        return start, stop, counts, slopes, intercepts, valid
+    finally:
+        input_shm.close()
+        output_shm.close()
+
+
+class ShardedBatchExecutor:
+    """
+    一括解析の (時間 × 列) 配列を、IDごとのシャードに分けてプロセスプールで並列計算するクラス。
+    入力データと振幅スペクトルは共有メモリで受け渡し、プロセス間のコピーを避ける。
+    """
+    def __init__(self, data_processor, workers=0):
+        self.data_processor = data_processor
+        self.workers = int(workers) if workers else (os.cpu_count() or 1)
+
+    def compute_columns(self, matrix, columns):
+        """DataProcessor.compute_columns と同じ (傾き, スペクトル) の辞書を返す"""
+        shards = self._split_shards(columns)
+        if self.workers <= 1 or len(shards) <= 1:
+            return self.data_processor.compute_columns(matrix, columns)
+
+        slopes, spectrums = {}, {}
+        num_rows, num_cols = matrix.shape
+        output_rows = num_rows // 2 + 1
+        input_shm = shared_memory.SharedMemory(create=True, size=max(1, matrix.nbytes))
+        output_shm = shared_memory.SharedMemory(create=True, size=max(1, output_rows * num_cols * 8))
+        shared_matrix = shared_amplitude = None
+        try:
+            shared_matrix = np.ndarray(matrix.shape, dtype=float, buffer=input_shm.buf)
+            shared_matrix[:] = matrix
+            shared_amplitude = np.ndarray((output_rows, num_cols), dtype=float, buffer=output_shm.buf)
+
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(shards))) as executor:
+                futures = [
+                    executor.submit(_compute_shard, input_shm.name, matrix.shape, output_shm.name, output_rows, start, stop)
+                    for start, stop in shards
+                ]
+                for future in futures:
+                    start, stop, counts, shard_slopes, intercepts, valid = future.result()
+                    # collect_results が振幅を列ごとにコピーするので、共有メモリを解放しても結果は残る
+                    self.data_processor.collect_column_arrays(
+                        columns[start:stop], counts, shard_slopes, intercepts, valid,
+                        shared_amplitude[:, start:stop], slopes, spectrums
+                    )
+        finally:
+            shared_matrix = shared_amplitude = None # 共有メモリを閉じる前に参照を外す
+            input_shm.close()
+            input_shm.unlink()
+            output_shm.close()
+            output_shm.unlink()
+        return slopes, spectrums
+
+    def _split_shards(self, columns):
+        """IDの境界で列を区切り、ワーカー数程度の連続した [start, stop) 区間に分ける"""
+        id_starts = [col for col, (id_name, _) in enumerate(columns) if col == 0 or columns[col - 1][0] != id_name]
+        num_shards = min(max(1, self.workers), len(id_starts))
+        if num_shards == 0:
+            return []
+
+        boundaries = [id_starts[round(i * len(id_starts) / num_shards)] for i in range(num_shards)] + [len(columns)]
+        return [(start, stop) for start, stop in zip(boundaries[:-1], boundaries[1:]) if start < stop]
@@ -16,11 +16,43 @@ class RealtimeSettingsConfig:
     yolo_model_path: str = "models/yolov8n.pt"
     mediapipe_model_path: str = "models/face_landmarker.task"
     device: str = "cpu"
+    metrics_interval_sec: float = 5.0 # 処理時間の要約をメインプロセスへ送る間隔 (秒)
+    metrics_window: int = 300 # 処理時間のパーセンタイルを計算する直近のサンプル数
+    frame_ring_slots: int = 3 # フレーム受け渡し用の共有メモリのスロット数
+    frame_max_width: int = 1920 # 共有メモリに格納できるフレームの最大幅 (超える場合は縮小)
+    frame_max_height: int = 1080 # 共有メモリに格納できるフレームの最大高さ
+    feature_ring_capacity: int = 4096 # 特徴量受け渡し用の共有メモリに保持するレコード数 (1人・1フレームで1件)
+    feature_ring_max_ids: int = 256 # 特徴量受け渡し用のIDテーブルに登録できるIDの数
+    backlog_policy: str = "keep_all" # 取り込みが追いつかないときの方針 ("keep_all", "coalesce": 平均して間引く, "drop_oldest": 古いものを捨てる)
+    backlog_max_frames: int = 30 # 1ティックで取り込むフレーム数の上限 ("coalesce"/"drop_oldest"のとき)
+    threaded_grabber: bool = True # カメラ入力のとき、別スレッドで読み続けて最新のフレームだけを解析する
+    detect_interval: int = 1 # YOLOで人物を検出する間隔 (フレーム数)。間のフレームは枠を等速で伝播する (1なら毎フレーム検出)
+    detect_interval_auto: bool = False # 検出にかかった時間から、detect_target_fps を満たす検出間隔を自動で決める
+    detect_target_fps: float = 10.0 # 検出間隔を自動で決めるときの目標の処理FPS
+    detect_max_interval: int = 10 # 検出間隔の上限 (フレーム数)
+    detect_motion_threshold: float = 12.0 # 前回の検出から画面がこれ以上変化したら (平均輝度差, 0-255) 間隔を待たずに検出する
+    extraction_mode: str = "crop" # 顔の特徴量の抽出方法 ("crop": 人物ごとに切り抜いて検出, "full_frame": フレーム全体で一度に検出して人物に割り当てる)
+    extract_threads: int = 1 # "crop"のとき、人物ごとの特徴量抽出を並列に行うスレッド数 (スレッドごとにモデルを読み込む)
+    max_faces: int = 10 # "full_frame"のとき、1フレームで検出する顔の最大数
+    landmarker_running_mode: str = "image" # MediaPipeの実行モード ("image": フレームごとに独立して検出, "video": 前フレームの結果を引き継いで追跡)
+    landmarker_idle_sec: float = 2.0 # "video"のとき、この秒数以上現れなかったIDのlandmarkerを破棄する
+    display_max_fps: float = 30.0 # 映像タブの表示を更新する最大FPS (映像処理のFPSとは独立。0なら制限なし)
+    capture_mode: str = "serial" # 映像処理の実行方法 ("serial": 1プロセスで順に処理, "pipelined": 取得・追跡・抽出を別プロセスで並行処理)
+    pipeline_slots: int = 8 # "pipelined"のとき、パイプライン内に同時に存在できるフレーム数
+    pipeline_extract_workers: int = 1 # "pipelined"のとき、特徴量抽出に使うプロセス数
 
 @dataclass
 class AnalysisParametersConfig:
     UPDATE_INTERVAL_MS: int = 1000
     SLIDING_WINDOW_SECONDS: int = 30
+    SLIDING_DFT_RESYNC_INTERVAL: int = 256 # スライディングDFTを厳密なFFTで再同期する間隔 (サンプル数)
+    FULL_SPECTRUM_MODE: str = "exact" # 全区間スペクトルの計算方法 ("exact": 全履歴をFFT, "welch": セグメント平均で逐次推定)
+    WELCH_SEGMENT_LENGTH: int = 64 # "welch"モードのセグメント長 (サンプル数)
+    TIMELINE_STRIDE: int = 0 # スライダー用タイムラインを事前計算する間隔 (0なら TIMELINE_MAX_POINTS から自動決定)
+    TIMELINE_MAX_POINTS: int = 2000 # 自動決定時のタイムラインの最大時点数
+    TIMELINE_WORKERS: int = 4 # タイムライン構築に使うスレッド数
+    FEATURE_CACHE_MAX_MB: int = 64 # 計算済み特徴量キャッシュの上限 (MB)
+    BATCH_WORKERS: int = 0 # 一括解析に使うプロセス数 (0ならCPUコア数, 1なら並列化しない)
 
 @dataclass
 class AppConfig:
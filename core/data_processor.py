@@ -3,6 +3,7 @@
 import pandas as pd
 import numpy as np
 from constants import ALL_VARIABLES
+from core.history_store import HistoryView
 
 class DataProcessor:
     """
@@ -10,55 +11,186 @@ class DataProcessor:
     """
     def calculate_slope(self, values):
         """時系列データからFFTを行い、そのパワースペクトルの傾きを計算する"""
-        n = len(values)
-        if n < 4: return 0, None, None, None
-        
-        fft_result = np.fft.rfft(values)
+        values = np.asarray(values, dtype=float)
+        if len(values) < 4: return 0, None, None, None
+
+        freq, amp, slopes, intercepts, valid = self.calculate_slopes_batch(values[:, np.newaxis])
+        if not valid[0]:
+            return 0, None, None, None
+
+        mask = self.spectrum_mask(freq, amp[:, 0])
+        return slopes[0], freq[mask], amp[mask, 0], intercepts[0]
+
+    def calculate_slopes_batch(self, matrix):
+        """
+        (時間 × 列) の2次元配列を受け取り、全列のFFTと傾きを一括で計算する。
+
+        Returns:
+            tuple: (frequency, amplitude, slopes, intercepts, valid)
+                   amplitudeは (周波数 × 列)、slopes/intercepts/validは列ごとの1次元配列。
+        """
+        n = matrix.shape[0]
+        fft_result = np.fft.rfft(matrix, axis=0)
         amplitude = np.abs(fft_result) / (n / 2)
         frequency = np.fft.rfftfreq(n, d=1.0)
-        mask = (frequency > 0) & (amplitude > 0)
-        
-        if np.sum(mask) < 2: return 0, None, None, None
-            
-        log_freq = np.log10(frequency[mask])
-        log_amp = np.log10(amplitude[mask])
-        
-        try:
-            slope, intercept = np.polyfit(log_freq, log_amp, 1)
-        except np.linalg.LinAlgError:
-            return 0, None, None, None
+        slopes, intercepts, valid = self.fit_loglog_slopes(frequency, amplitude)
+        return frequency, amplitude, slopes, intercepts, valid
+
+    def fit_loglog_slopes(self, frequency, amplitude):
+        """
+        両対数軸上の一次近似を、マスク付きの最小二乗法で全列まとめて計算する。
+        (列ごとの np.polyfit(log_freq, log_amp, 1) と同じ結果になる)
+        """
+        mask = self.spectrum_mask(frequency, amplitude)
+        count = mask.sum(axis=0)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_freq = np.where(mask, np.log10(frequency)[:, np.newaxis], 0.0)
+            log_amp = np.where(mask, np.log10(amplitude), 0.0)
 
-        return slope, frequency[mask], amplitude[mask], intercept
+            sum_x = log_freq.sum(axis=0)
+            sum_y = log_amp.sum(axis=0)
+            sum_xx = (log_freq * log_freq).sum(axis=0)
+            sum_xy = (log_freq * log_amp).sum(axis=0)
+
+            denominator = count * sum_xx - sum_x * sum_x
+            slopes = (count * sum_xy - sum_x * sum_y) / denominator
+            intercepts = (sum_y - slopes * sum_x) / count
+
+        # 点が2つ未満、または近似が解けない列は無効扱い (calculate_slopeの0返却と同じ)
+        valid = (count >= 2) & np.isfinite(slopes) & np.isfinite(intercepts) & (np.abs(denominator) > 1e-12)
+        slopes = np.where(valid, slopes, 0.0)
+        intercepts = np.where(valid, intercepts, 0.0)
+        return slopes, intercepts, valid
+
+    @staticmethod
+    def spectrum_mask(frequency, amplitude):
+        """近似に使う点 (周波数 > 0 かつ 振幅 > 0) のマスクを返す"""
+        if amplitude.ndim == 2:
+            return (frequency > 0)[:, np.newaxis] & (amplitude > 0)
+        return (frequency > 0) & (amplitude > 0)
 
     def get_features_from_df(self, df, active_ids):
         """【メインの計算ロジック】DataFrameから全IDの特徴量とスペクトルを計算する"""
         if df is None or df.empty or not active_ids:
             return pd.DataFrame(), {}
 
-        feature_matrix = {id_name: {} for id_name in active_ids}
-        power_spectrums = {id_name: {} for id_name in active_ids}
-
-        for id_name in active_ids:
-            slopes = {}
-            for var in ALL_VARIABLES:
-                column_name = f"{id_name}_{var}"
-                if column_name in df.columns:
-                    values = df[column_name].dropna().values
-                    slope, freq, amp, intercept = self.calculate_slope(values)
-                    slopes[var] = slope
-                    if freq is not None:
-                        power_spectrums[id_name][var] = (freq, amp, slope, intercept)
-                else:
-                    slopes[var] = 0
-            feature_matrix[id_name] = slopes
-        
+        columns = [(id_name, var) for id_name in active_ids for var in ALL_VARIABLES if f"{id_name}_{var}" in df.columns]
+        if not columns:
+            return self.build_features(active_ids, {}, {})
+
+        matrix = df[[f"{id_name}_{var}" for id_name, var in columns]].to_numpy(dtype=float)
+        return self.get_features_from_matrix(matrix, columns, active_ids)
+
+    def get_features_from_matrix(self, matrix, columns, active_ids):
+        """
+        (時間 × 列) の配列から全列の特徴量とスペクトルを一括計算する。
+        columnsは各列に対応する (ID, 変数名) のリスト。NaNは列ごとに除外して計算する。
+        """
+        slopes, spectrums = self.compute_columns(matrix, columns)
+        return self.build_features(active_ids, slopes, spectrums)
+
+    def compute_columns(self, matrix, columns):
+        """
+        (時間 × 列) の配列を計算し、(ID, 変数名) をキーとする傾きとスペクトルの辞書を返す。
+        """
+        slopes, spectrums = {}, {}
+        if matrix.size == 0:
+            return slopes, spectrums
+
+        self.collect_column_arrays(columns, *self.compute_column_arrays(matrix), slopes, spectrums)
+        return slopes, spectrums
+
+    def compute_column_arrays(self, matrix, amplitude_out=None):
+        """
+        (時間 × 列) の配列を計算し、列ごとの (有効データ長, 傾き, 切片, 有効フラグ, 振幅) を配列のまま返す。
+        振幅は (周波数 × 列) の配列で、各列の先頭 (有効データ長 // 2 + 1) 行だけが意味を持つ。
+        amplitude_outを渡した場合は、振幅をその配列 (共有メモリ上の配列など) に書き込む。
+        """
+        num_rows, num_cols = matrix.shape
+        slopes = np.zeros(num_cols)
+        intercepts = np.zeros(num_cols)
+        valid = np.zeros(num_cols, dtype=bool)
+        if amplitude_out is None:
+            amplitude_out = np.full((num_rows // 2 + 1, num_cols), np.nan)
+
+        # dropna()と同じ結果になるよう、各列の有効値を先頭に詰める (順序は維持)
+        not_nan = ~np.isnan(matrix)
+        counts = not_nan.sum(axis=0)
+        if num_cols == 0 or counts.min() == num_rows:
+            packed = matrix
+        else:
+            order = np.argsort(~not_nan, axis=0, kind='stable')
+            packed = np.take_along_axis(matrix, order, axis=0)
+
+        # 有効データ長が同じ列ごとに、1回のrfftでまとめて計算する
+        for n in np.unique(counts):
+            if n < 4:
+                continue
+            col_indices = np.flatnonzero(counts == n)
+            freq, amp, group_slopes, group_intercepts, group_valid = self.calculate_slopes_batch(packed[:n, col_indices])
+            amplitude_out[:len(freq), col_indices] = amp
+            slopes[col_indices] = group_slopes
+            intercepts[col_indices] = group_intercepts
+            valid[col_indices] = group_valid
+
+        return counts, slopes, intercepts, valid, amplitude_out
+
+    def collect_column_arrays(self, columns, counts, slopes, intercepts, valid, amplitude, slopes_out, spectrums_out):
+        """compute_column_arraysの結果を、列ごとの傾きと (freq, amp, slope, intercept) に振り分ける"""
+        for n in np.unique(counts):
+            col_indices = np.flatnonzero(counts == n)
+            group_columns = [columns[col] for col in col_indices]
+            if n < 4:
+                slopes_out.update({column: 0 for column in group_columns})
+                continue
+
+            freq = np.fft.rfftfreq(n, d=1.0)
+            self.collect_results(
+                group_columns, freq, amplitude[:len(freq), col_indices],
+                slopes[col_indices], intercepts[col_indices], valid[col_indices], slopes_out, spectrums_out
+            )
+
+    def collect_results(self, columns, frequency, amplitude, slopes, intercepts, valid, slopes_out, spectrums_out):
+        """一括計算の結果を、列ごとの傾きと (freq, amp, slope, intercept) に振り分ける"""
+        masks = self.spectrum_mask(frequency, amplitude)
+        for i, column in enumerate(columns):
+            slopes_out[column] = slopes[i]
+            if valid[i]:
+                mask = masks[:, i]
+                spectrums_out[column] = (frequency[mask], amplitude[mask, i], slopes[i], intercepts[i])
+
+    def build_features(self, active_ids, slopes, spectrums):
+        """
+        (ID, 変数名) をキーとする計算結果を、従来の (slope_df, power_spectrums) 形式にまとめる。
+        """
+        feature_matrix = {id_name: {var: slopes.get((id_name, var), 0) for var in ALL_VARIABLES} for id_name in active_ids}
+        # 変数の並び (slopes_and_intercepts.csv の行順) は、計算順ではなく ALL_VARIABLES の順にそろえる
+        power_spectrums = {
+            id_name: {var: spectrums[(id_name, var)] for var in ALL_VARIABLES if (id_name, var) in spectrums}
+            for id_name in active_ids
+        }
+
         return pd.DataFrame(feature_matrix).T, power_spectrums
 
+    def get_features_from_history(self, history, active_ids):
+        """HistoryStore (またはそのビュー) から、DataFrameを介さずに特徴量とスペクトルを計算する"""
+        if not history or not active_ids:
+            return pd.DataFrame(), {}
+
+        columns, matrix = history.columns_for(active_ids)
+        return self.get_features_from_matrix(matrix, columns, active_ids)
+
     def convert_history_to_df(self, history_slice, active_ids):
-        """history形式のデータ(辞書のリスト)をDataFrameに変換する"""
+        """history形式のデータ(HistoryStoreのビュー、または辞書のリスト)をDataFrameに変換する"""
         if not history_slice or not active_ids:
             return pd.DataFrame()
 
+        if isinstance(history_slice, HistoryView):
+            columns, matrix = history_slice.columns_for(active_ids)
+            index = pd.Index(history_slice.timestamps, name='timestamp')
+            return pd.DataFrame(matrix, index=index, columns=[f"{id_name}_{var}" for id_name, var in columns])
+
         records = []
         for dp in history_slice:
             record = {'timestamp': dp['timestamp']}
@@ -67,5 +199,5 @@ class DataProcessor:
                     for var, value in dp[id_name].items():
                         record[f"{id_name}_{var}"] = value
             records.append(record)
-        
-        return pd.DataFrame(records).set_index('timestamp')
\ No newline at end of file
+
+        return pd.DataFrame(records).set_index('timestamp')
@@ -0,0 +1,86 @@
+# ファイル名: core/feature_cache.py (新規作成)
+
+from collections import OrderedDict
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+from core.feature_timeline import LazyPowerSpectrums
+
+class FeatureCache:
+    """
+    計算済みの (slope_dfs, power_spectrums) を保持する、メモリ量で上限を設けたLRUキャッシュ。
+
+    キャッシュはhistoryオブジェクトとその版数 (HistoryStore.version) に紐づけ、
+    historyへの追記や作り直し (リセット・解析の再開始) を検知したら自動的に全て破棄する。
+    """
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max(0, int(max_bytes))
+        self._entries = OrderedDict() # key -> (value, 推定バイト数)
+        self._total_bytes = 0
+        self._history = None
+        self._history_version = None
+
+    def clear(self):
+        """全てのエントリを破棄する"""
+        self._entries.clear()
+        self._total_bytes = 0
+        self._history = None
+        self._history_version = None
+
+    def _sync_history(self, history):
+        """キャッシュ作成時とhistoryが異なる (作り直された・追記された) 場合は破棄する"""
+        version = getattr(history, 'version', None)
+        if history is not self._history or version != self._history_version:
+            self.clear()
+            self._history = history
+            self._history_version = version
+
+    def get(self, history, key):
+        """キャッシュされた値を返す。なければNone"""
+        self._sync_history(history)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+
+        # 遅延計算されたスペクトルは参照後にサイズが増えるので、取り出すたびに測り直す
+        value, size = entry
+        new_size = self.estimate_size(value)
+        if new_size != size:
+            self._entries[key] = (value, new_size)
+            self._total_bytes += new_size - size
+            self._evict()
+        return value
+
+    def put(self, history, key, value):
+        """値をキャッシュに追加し、上限を超えた分を古い順に破棄する"""
+        self._sync_history(history)
+        size = self.estimate_size(value)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._total_bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (value, size)
+        self._total_bytes += size
+        self._evict()
+
+    def _evict(self):
+        """上限を下回るまで、最も古く参照されたエントリから破棄する (最新の1件は残す)"""
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            self._total_bytes -= self._entries.popitem(last=False)[1][1]
+
+    @classmethod
+    def estimate_size(cls, value):
+        """DataFrame・配列・入れ子の辞書/タプルに含まれる数値データのバイト数を概算する"""
+        if isinstance(value, pd.DataFrame):
+            return int(value.memory_usage(index=True).sum())
+        if isinstance(value, np.ndarray):
+            return value.nbytes
+        if isinstance(value, LazyPowerSpectrums):
+            value = value.loaded() # まだ計算していない値は数えない
+        if isinstance(value, Mapping):
+            return sum(cls.estimate_size(item) for item in value.values())
+        if isinstance(value, (tuple, list)):
+            return sum(cls.estimate_size(item) for item in value)
+        return 8
@@ -0,0 +1,158 @@
+# ファイル名: core/feature_timeline.py (新規作成)
+
+import math
+import threading
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from constants import ALL_VARIABLES
+
+class LazyPowerSpectrums(Mapping):
+    """
+    'full' / 'sliding' のパワースペクトルを、最初に参照されたときに計算する辞書。
+    スペクトルを表示・保存しない操作 (スライダーでの傾き確認など) では計算を省略できる。
+    """
+    def __init__(self, loaders):
+        self._loaders = loaders
+        self._values = {}
+
+    def __getitem__(self, key):
+        if key not in self._values:
+            self._values[key] = self._loaders[key]()
+        return self._values[key]
+
+    def __iter__(self):
+        return iter(self._loaders)
+
+    def __len__(self):
+        return len(self._loaders)
+
+    def loaded(self):
+        """計算済みの値だけを辞書で返す"""
+        return dict(self._values)
+
+
+class FeatureTimeline:
+    """
+    historyの各インデックス (またはstride間隔) における全区間・スライディング窓の傾きを
+    バックグラウンドで事前計算し、(時点 × ID × 変数) のfloat32配列に保持するクラス。
+    スライダー操作時は再計算の代わりにこの配列を参照する。
+    """
+    def __init__(self, analysis_service, stride=0, max_points=2000, workers=4):
+        self.analysis_service = analysis_service
+        self.stride_setting = max(0, int(stride))
+        self.max_points = max(1, int(max_points))
+        self.workers = max(1, int(workers))
+        self._lock = threading.Lock()
+        self._thread = None
+        self._cancel_event = threading.Event()
+        self.invalidate()
+
+    def invalidate(self):
+        """構築中・構築済みのタイムラインを破棄する"""
+        self._cancel_event.set()
+        with self._lock:
+            self.history = None
+            self.active_ids = []
+            self.window = None
+            self.stride = 1
+            self.indices = np.empty(0, dtype=int)
+            self.slopes = {}
+            self.is_ready = False
+            self.progress = 0
+
+    def build_async(self, history, active_ids, window):
+        """historyの現在の内容に対するタイムラインを別スレッドで構築する"""
+        self.invalidate()
+        if not history or not active_ids:
+            return
+
+        length = len(history)
+        stride = self.stride_setting or max(1, math.ceil(length / self.max_points))
+        # strideがhistoryより長い場合も、最新の時点は必ず含める
+        indices = np.arange(min(stride, length) - 1, length, stride)
+        if indices[-1] != length - 1:
+            indices = np.append(indices, length - 1)
+
+        cancel_event = threading.Event()
+        self._cancel_event = cancel_event
+        snapshot = history[:length] # 構築中に追記されても影響を受けないビュー
+        self._thread = threading.Thread(
+            target=self._build,
+            args=(history, snapshot, list(active_ids), int(window), stride, indices, cancel_event),
+            daemon=True
+        )
+        self._thread.start()
+
+    def _build(self, history, snapshot, active_ids, window, stride, indices, cancel_event):
+        """【別スレッド】各時点の傾きを計算する"""
+        shape = (len(indices), len(active_ids), len(ALL_VARIABLES))
+        slopes = {'full': np.zeros(shape, dtype=np.float32), 'sliding': np.zeros(shape, dtype=np.float32)}
+        service = self.analysis_service
+        print(f"INFO: (別スレッド) タイムラインの構築を開始します。({len(indices)}時点, stride={stride})")
+
+        def compute_point(point):
+            if cancel_event.is_set():
+                return
+            index = int(indices[point])
+            if not service.uses_welch_full_spectrum:
+                slopes['full'][point] = self._slope_array(snapshot[:index + 1], active_ids)
+            slopes['sliding'][point] = self._slope_array(snapshot[max(0, index - window + 1):index + 1], active_ids)
+
+        try:
+            if service.uses_welch_full_spectrum:
+                # Welch法は先頭から順に積み上げる方が速いので、全区間だけ逐次で計算する
+                accumulator = service.create_welch_accumulator()
+                for point, index in enumerate(indices):
+                    if cancel_event.is_set():
+                        return
+                    accumulator.advance(snapshot, int(index) + 1)
+                    df_features, _ = accumulator.get_features(active_ids)
+                    slopes['full'][point] = df_features.to_numpy(dtype=np.float32)
+
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                for done, _ in enumerate(executor.map(compute_point, range(len(indices))), start=1):
+                    self.progress = done / len(indices)
+
+            with self._lock:
+                # invalidate() はロックを取ってから結果を消すため、ロック内で確認すれば古い結果を公開しない
+                if cancel_event.is_set():
+                    return
+                self.history = history
+                self.active_ids = active_ids
+                self.window = window
+                self.stride = stride
+                self.indices = indices
+                self.slopes = slopes
+                self.is_ready = True
+            print("INFO: (別スレッド) タイムラインの構築が完了しました。")
+        except Exception as e:
+            print(f"ERROR: (別スレッド) タイムラインの構築中にエラーが発生しました: {e}")
+
+    def _slope_array(self, history_slice, active_ids):
+        """historyの区間から (ID × 変数) の傾き配列を計算する"""
+        result = np.zeros((len(active_ids), len(ALL_VARIABLES)), dtype=np.float32)
+        columns, matrix = history_slice.columns_for(active_ids)
+        slopes, _ = self.analysis_service.data_processor.compute_columns(matrix, columns)
+        id_positions = {id_name: i for i, id_name in enumerate(active_ids)}
+        for (id_name, var), slope in slopes.items():
+            result[id_positions[id_name], ALL_VARIABLES.index(var)] = slope
+        return result
+
+    def lookup(self, history, index, active_ids, window):
+        """
+        事前計算済みの傾きを {'full': df, 'sliding': df} で返す。
+        該当する時点がない、またはhistory・ID・窓長が構築時と異なる場合はNoneを返す。
+        """
+        with self._lock:
+            if not self.is_ready or history is not self.history or list(active_ids) != self.active_ids or window != self.window:
+                return None
+            point = np.searchsorted(self.indices, index)
+            if point >= len(self.indices) or self.indices[point] != index:
+                return None
+            return {
+                key: pd.DataFrame(values[point].astype(float), index=self.active_ids, columns=ALL_VARIABLES)
+                for key, values in self.slopes.items()
+            }
@@ -0,0 +1,95 @@
+# ファイル名: core/feature_worker.py (新規作成)
+
+import threading
+import traceback
+from dataclasses import dataclass
+from typing import Any
+
+@dataclass(frozen=True)
+class FeatureSnapshot:
+    """1回分の特徴量の計算結果。UIスレッドへ渡した後は変更しない"""
+    seq: int # 計算依頼の通し番号
+    history: Any # 計算に使ったhistory (計算中にリセットされた場合の判定用)
+    target_index: int # 計算したhistoryの位置
+    slope_dfs: dict
+    power_spectrums: Any
+
+class FeatureWorker:
+    """
+    ティックごとの特徴量の計算を、Tkのメインスレッドから切り離して専用のスレッドで行うクラス。
+
+    submit で計算を依頼し、take_snapshot で最新の結果を受け取る。
+    計算が追いつかない場合、まだ始まっていない古い依頼は最新の依頼で置き換えて捨てる (dropped_requests に数える)。
+    UIスレッドは計算中もhistoryへの追記やIDの追加を続けるため、計算には依頼時点で固定したものだけを使う。
+    historyのスライスは依頼時点のID軸・行数で固定されたビューで、active_idsは依頼時にタプルへコピーする。
+    """
+    def __init__(self, analysis_service):
+        self.analysis_service = analysis_service
+        self._condition = threading.Condition()
+        self._request = None # 未着手の依頼 (seq, history, target_index, full_slice, sliding_slice, active_ids, spectrum_keys)
+        self._snapshot = None # 未受け取りの最新の結果
+        self._computing = False
+        self._seq = 0
+        self.dropped_requests = 0
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="feature-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, history, target_index, full_slice, sliding_slice, active_ids, spectrum_keys=()):
+        """
+        計算を依頼する。未着手の依頼があれば置き換える。
+        spectrum_keys に指定したスペクトル ('full' / 'sliding') は、遅延計算になる場合も結果を渡す前に計算しておく。
+        """
+        request = (history, target_index, full_slice, sliding_slice, tuple(active_ids), tuple(spectrum_keys))
+        with self._condition:
+            if self._request is not None:
+                self.dropped_requests += 1
+            self._seq += 1
+            self._request = (self._seq, *request)
+            self._condition.notify()
+
+    def take_snapshot(self):
+        """最新の計算結果を受け取る (前回以降に新しい結果がなければNone)"""
+        with self._condition:
+            snapshot, self._snapshot = self._snapshot, None
+            return snapshot
+
+    @property
+    def is_busy(self):
+        """未着手の依頼・計算中の依頼・未受け取りの結果のいずれかがあるか"""
+        with self._condition:
+            return self._request is not None or self._computing or self._snapshot is not None
+
+    def stop(self):
+        """未着手の依頼を破棄してスレッドを終了する (計算中の依頼があれば終わるまで最大2秒待つ)"""
+        with self._condition:
+            self._running = False
+            self._request = None
+            self._condition.notify()
+        self._thread.join(timeout=2)
+
+    def _run(self):
+        """【ワーカースレッド】依頼を1件ずつ取り出して計算し、結果を公開する"""
+        while True:
+            with self._condition:
+                while self._request is None and self._running:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                seq, history, target_index, full_slice, sliding_slice, active_ids, spectrum_keys = self._request
+                self._request = None
+                self._computing = True
+
+            try:
+                slope_dfs, power_spectrums = self.analysis_service.compute_features(full_slice, sliding_slice, history, active_ids)
+                # 表示中のスペクトルはここで計算し、UIスレッドでの遅延計算を避ける
+                self.analysis_service.materialize_spectrums(power_spectrums, spectrum_keys)
+                snapshot = FeatureSnapshot(seq, history, target_index, slope_dfs, power_spectrums)
+            except Exception as e:
+                print(f"ERROR: (別スレッド) 特徴量の計算中にエラーが発生しました: {e}\n{traceback.format_exc()}")
+                snapshot = None
+
+            with self._condition:
+                self._computing = False
+                if snapshot is not None:
+                    self._snapshot = snapshot # 受け取られていない古い結果は上書きする
@@ -0,0 +1,219 @@
+# ファイル名: core/history_store.py (新規作成)
+
+import numpy as np
+from constants import ALL_VARIABLES
+
+class HistoryView:
+    """
+    HistoryStoreの一部区間を指す読み取り専用のビュー。
+    データはコピーせず、ストアの配列をそのまま参照する。
+
+    従来のhistory (辞書のリスト) と同じく len() / 添字 / スライスで扱え、
+    添字アクセスしたときだけ {'timestamp': ..., 'ID_1': {var: value}} 形式のパケットを組み立てる。
+    """
+    def __init__(self, timestamps, values, slot_ids, slot_index=None):
+        self._timestamps = timestamps
+        self._values = values
+        self.slot_ids = slot_ids
+        # ストアから切り出したビューは、ストアのID → インデックスの辞書をそのまま共有する
+        self._slot_index = slot_index if slot_index is not None else {id_name: slot for slot, id_name in enumerate(slot_ids)}
+
+    @property
+    def timestamps(self):
+        """タイムスタンプの配列 (時間,)"""
+        return self._timestamps
+
+    @property
+    def values(self):
+        """特徴量の配列 (時間 × ID × 変数)。記録のない値はNaN"""
+        return self._values
+
+    @property
+    def slot_index(self):
+        """ID名 → ID軸のインデックス (ストアやほかのビューと共有しているため、変更しないこと)"""
+        return self._slot_index
+
+    def __len__(self):
+        return len(self._timestamps)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            if key.step not in (None, 1):
+                raise ValueError("historyのスライスはstep=1のみ対応しています。")
+            start, stop, _ = key.indices(len(self))
+            stop = max(start, stop)
+            return HistoryView(self._timestamps[start:stop], self._values[start:stop], self.slot_ids, self._slot_index)
+
+        index = key + len(self) if key < 0 else key
+        if not 0 <= index < len(self):
+            raise IndexError("history index out of range")
+        return self._build_packet(index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self._build_packet(index)
+
+    def _build_packet(self, index):
+        """1時点分のデータを従来のパケット形式に組み立てる"""
+        packet = {'timestamp': self._timestamps[index].item()}
+        row = self._values[index]
+        for slot, id_name in enumerate(self.slot_ids):
+            id_data = {var: row[slot, var_index].item() for var_index, var in enumerate(ALL_VARIABLES) if not np.isnan(row[slot, var_index])}
+            if id_data:
+                packet[id_name] = id_data
+        return packet
+
+    def columns_for(self, active_ids):
+        """
+        active_idsのうち記録がある (ID, 変数名) の列と、(時間 × 列) の配列を返す。
+        従来のDataFrame変換で列が作られなかった (全てNaNの) 列は含めない。
+        """
+        slot_index = self.slot_index
+        present = ~np.isnan(self._values).all(axis=0)
+        columns, slots, var_indices = [], [], []
+        for id_name in active_ids:
+            slot = slot_index.get(id_name)
+            if slot is None:
+                continue
+            for var_index, var in enumerate(ALL_VARIABLES):
+                if present[slot, var_index]:
+                    columns.append((id_name, var))
+                    slots.append(slot)
+                    var_indices.append(var_index)
+        return columns, self._values[:, slots, var_indices]
+
+
+class HistoryStore(HistoryView):
+    """
+    解析履歴を (時間 × ID × 変数) のfloat配列で保持する列指向のストア。
+
+    配列はあらかじめ確保しておき、足りなくなったら倍々に拡張する。
+    スライスはコピーを作らないビュー (HistoryView) を返す。
+    """
+    def __init__(self, initial_capacity=1024, initial_slots=4):
+        self._length = 0
+        self.version = 0 # 追記のたびに増える版数 (キャッシュの無効化に使う)
+        self.slot_ids = []
+        self._slot_index = {} # ID名 → ID軸のインデックス (ensure_slotで更新する)
+        self._timestamp_buffer = np.empty(max(1, initial_capacity))
+        self._value_buffer = np.full((max(1, initial_capacity), max(1, initial_slots), len(ALL_VARIABLES)), np.nan)
+
+    @classmethod
+    def from_packets(cls, packets):
+        """従来形式のパケットのリストからストアを作成する"""
+        store = cls(initial_capacity=len(packets))
+        store.extend(packets)
+        return store
+
+    @classmethod
+    def from_dataframe(cls, df, active_ids):
+        """
+        CSVを結合したDataFrame ('{ID}_{変数名}' 列、インデックスがタイムスタンプ) から、
+        行ごとのパケットを組み立てずに列単位でストアを作成する
+        """
+        if df is None or df.empty:
+            return cls()
+
+        # 値が1つもないIDは、パケットから作成した場合と同じくスロットを作らない
+        id_columns = {}
+        for id_name in active_ids:
+            present = [(var_index, f"{id_name}_{var}") for var_index, var in enumerate(ALL_VARIABLES) if f"{id_name}_{var}" in df.columns]
+            if present and df[[col for _, col in present]].notna().to_numpy().any():
+                id_columns[id_name] = present
+
+        store = cls(initial_capacity=len(df), initial_slots=len(id_columns))
+        store._timestamp_buffer[:len(df)] = df.index.to_numpy(dtype=float)
+        for slot, (id_name, present) in enumerate(id_columns.items()):
+            var_indices = [var_index for var_index, _ in present]
+            store._value_buffer[:len(df), slot, var_indices] = df[[col for _, col in present]].to_numpy(dtype=float)
+        store.slot_ids = list(id_columns)
+        store._slot_index = {id_name: slot for slot, id_name in enumerate(store.slot_ids)}
+        store._length = len(df)
+        store.version += 1
+        return store
+
+    @property
+    def _timestamps(self):
+        return self._timestamp_buffer[:self._length]
+
+    @property
+    def _values(self):
+        return self._value_buffer[:self._length, :len(self.slot_ids)]
+
+    def __len__(self):
+        return self._length
+
+    def _ensure_capacity(self, length, num_slots):
+        """時間方向・ID方向の容量が足りなければ、倍々に拡張した配列へ移し替える"""
+        capacity, slot_capacity = self._value_buffer.shape[:2]
+        if length <= capacity and num_slots <= slot_capacity:
+            return
+
+        while capacity < length:
+            capacity *= 2
+        while slot_capacity < num_slots:
+            slot_capacity *= 2
+
+        # 既存のビューは古い配列を参照し続けるため、内容はそのまま残る
+        timestamps = np.empty(capacity)
+        timestamps[:self._length] = self._timestamps
+        values = np.full((capacity, slot_capacity, len(ALL_VARIABLES)), np.nan)
+        values[:self._length, :len(self.slot_ids)] = self._values
+        self._timestamp_buffer, self._value_buffer = timestamps, values
+
+    def ensure_slot(self, id_name):
+        """IDに対応するID軸のインデックスを返す。新しいIDなら追加する"""
+        slot = self._slot_index.get(id_name)
+        if slot is not None:
+            return slot
+
+        slot = len(self.slot_ids)
+        self._ensure_capacity(self._length, slot + 1)
+        # 既存のビューが持つリスト・辞書は変更せず、新しいものに置き換える (IDの追加は稀なのでコピーの負担は小さい)
+        self.slot_ids = self.slot_ids + [id_name]
+        self._slot_index = {**self._slot_index, id_name: slot}
+        return slot
+
+    def append(self, packet):
+        """従来形式のパケットを1つ追加する"""
+        for key in packet:
+            if key != 'timestamp':
+                self.ensure_slot(key)
+        self._ensure_capacity(self._length + 1, len(self.slot_ids))
+
+        index = self._length
+        self._timestamp_buffer[index] = packet['timestamp']
+        row = self._value_buffer[index]
+        for slot, id_name in enumerate(self.slot_ids):
+            id_data = packet.get(id_name)
+            if not id_data:
+                continue
+            for var_index, var in enumerate(ALL_VARIABLES):
+                if var in id_data:
+                    row[slot, var_index] = id_data[var]
+        self._length += 1
+        self.version += 1
+
+    def append_block(self, timestamps, id_names, values):
+        """
+        複数時点分のデータを配列のまままとめて追加する。
+        valuesは (時点 × len(id_names) × 変数) の配列で、記録のない値はNaNとする。
+        """
+        if len(timestamps) == 0:
+            return
+        slots = [self.ensure_slot(id_name) for id_name in id_names]
+        start, stop = self._length, self._length + len(timestamps)
+        self._ensure_capacity(stop, len(self.slot_ids))
+        self._timestamp_buffer[start:stop] = timestamps
+        if slots:
+            self._value_buffer[start:stop, slots] = values
+        self._length = stop
+        self.version += 1
+
+    def extend(self, packets):
+        """従来形式のパケットをまとめて追加する"""
+        for packet in packets:
+            self.append(packet)
@@ -1,6 +1,7 @@
 # ファイル名: model.py (修正後)
 
 from . import data_loader
+from .history_store import HistoryStore
 
 class AnalysisModel:
     def __init__(self):
@@ -9,7 +10,7 @@ class AnalysisModel:
         計算ロジックは持たない。
         """
         # --- データ管理 ---
-        self.full_history = []
+        self.full_history = HistoryStore()
         self.active_ids = []
         self.time_series_df = None
         self.csv_replay_data = None
@@ -17,6 +18,18 @@ class AnalysisModel:
         # 計算結果を保持するプロパティ
         self.last_power_spectrums = {}
         self.last_slope_dfs = {}
+        self.features_version = 0 # 計算結果が入れ替わるたびに増える (ビューの再描画の要否の判定に使う)
+
+    def set_features(self, slope_dfs, power_spectrums):
+        """計算結果を格納する。前回と別の結果であれば features_version を進める"""
+        if slope_dfs is not self.last_slope_dfs or power_spectrums is not self.last_power_spectrums:
+            self.features_version += 1
+        self.last_slope_dfs = slope_dfs
+        self.last_power_spectrums = power_spectrums
+
+    def reset_history(self):
+        """解析履歴を空のストアに置き換える"""
+        self.full_history = HistoryStore()
 
     def load_csv_data(self, filepaths):
         """CSVを読み込み、自身のデータとして保持する"""
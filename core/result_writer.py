@@ -0,0 +1,33 @@
+# ファイル名: core/result_writer.py (新規作成)
+
+import os
+import pandas as pd
+
+FEATURES_FILENAME = "features.csv"
+SLOPES_FILENAME = "slopes_and_intercepts.csv"
+
+def write_features_csv(df_features, filepath):
+    """特徴量 (傾き) のDataFrameをCSVに保存する。空の場合は保存せずFalseを返す"""
+    if df_features is None or df_features.empty:
+        return False
+    df_features.to_csv(filepath, encoding='utf-8-sig')
+    return True
+
+def write_slopes_csv(power_spectrums, filepath):
+    """全区間スペクトルの傾きと切片を (ID, Variable, Slope, Intercept) 形式のCSVに保存する"""
+    results_list = []
+    for id_name, var_data in power_spectrums.items():
+        for var_name, spec_tuple in var_data.items():
+            _freq, _amp, slope, intercept = spec_tuple
+            if slope is not None and intercept is not None:
+                results_list.append({'ID': id_name, 'Variable': var_name, 'Slope': slope, 'Intercept': intercept})
+    if not results_list:
+        return False
+    pd.DataFrame(results_list).to_csv(filepath, index=False, encoding='utf-8-sig')
+    return True
+
+def write_results(output_folder, df_features, power_spectrums):
+    """features.csv と slopes_and_intercepts.csv をフォルダに保存する (GUIの保存と同じ形式)"""
+    os.makedirs(output_folder, exist_ok=True)
+    write_features_csv(df_features, os.path.join(output_folder, FEATURES_FILENAME))
+    write_slopes_csv(power_spectrums, os.path.join(output_folder, SLOPES_FILENAME))
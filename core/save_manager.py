@@ -4,12 +4,12 @@ from tkinter import filedialog
 import threading
 import os
 from datetime import datetime
-import pandas as pd
 import matplotlib
 
 from app.views.progress_dialog import ProgressDialog
 from app.views.save_selection_dialog import SaveSelectionDialog
 from constants import ALL_VARIABLES
+from core.result_writer import FEATURES_FILENAME, SLOPES_FILENAME, write_features_csv, write_slopes_csv
 
 class SaveManager:
     def __init__(self, controller):
@@ -30,20 +30,15 @@ class SaveManager:
         # --- 1. 保存対象となるデータのスナップショットを作成 ---
         history_slice_to_save = self.model.full_history[:save_index + 1]
         sliding_slice_to_save = self.model.full_history[max(0, save_index - self.controller.sliding_window + 1): save_index + 1]
-        save_timestamp = history_slice_to_save[-1]['timestamp']
+        save_timestamp = history_slice_to_save.timestamps[-1]
         
-        data_processor = self.controller.data_processor
-        active_ids = self.model.active_ids
+        # 表示中と同じ位置であれば、解析サービスのキャッシュから再計算せずに取得される
+        slope_dfs, power_spectrums = self.controller.analysis_service.compute_features(history_slice_to_save, sliding_slice_to_save)
 
-        df_full_history = data_processor.convert_history_to_df(history_slice_to_save, active_ids)
-        df_full, ps_full = data_processor.get_features_from_df(df_full_history, active_ids)
-
-        df_sliding_history = data_processor.convert_history_to_df(sliding_slice_to_save, active_ids)
-        df_sliding, ps_sliding = data_processor.get_features_from_df(df_sliding_history, active_ids)
-        
         all_data_to_save = {
-            'slope_dfs': {'full': df_full, 'sliding': df_sliding},
-            'power_spectrums': {'full': ps_full, 'sliding': ps_sliding}
+            'slope_dfs': slope_dfs,
+            # 遅延計算のスペクトルは保存スレッドに渡す前にここで確定させる
+            'power_spectrums': {key: power_spectrums[key] for key in power_spectrums}
         }
 
         # --- 2. ユーザーに保存項目を選択させる ---
@@ -105,22 +100,13 @@ class SaveManager:
             if cancel_check(): return
             if save_selection.get("features_csv"):
                 df_to_save = all_data.get('slope_dfs', {}).get('full')
-                if df_to_save is not None and not df_to_save.empty:
-                    filepath = os.path.join(output_folder, "features.csv")
-                    df_to_save.to_csv(filepath, encoding='utf-8-sig')
+                write_features_csv(df_to_save, os.path.join(output_folder, FEATURES_FILENAME))
                 progress_callback()
 
             if cancel_check(): return
             if save_selection.get("slopes_csv"):
-                results_list = []
                 spectrum_data = all_data.get('power_spectrums', {}).get('full', {})
-                for id_name, var_data in spectrum_data.items():
-                    for var_name, spec_tuple in var_data.items():
-                        _freq, _amp, slope, intercept = spec_tuple
-                        if slope is not None and intercept is not None:
-                            results_list.append({'ID': id_name, 'Variable': var_name, 'Slope': slope, 'Intercept': intercept})
-                if results_list:
-                    pd.DataFrame(results_list).to_csv(os.path.join(output_folder, "slopes_and_intercepts.csv"), index=False, encoding='utf-8-sig')
+                write_slopes_csv(spectrum_data, os.path.join(output_folder, SLOPES_FILENAME))
                 progress_callback()
 
             # --- 各Viewのグラフ保存 ---
@@ -0,0 +1,253 @@
+# ファイル名: core/spectrum_estimators.py (新規作成)
+
+import numpy as np
+from constants import ALL_VARIABLES
+
+class _StreamingSpectrumBase:
+    """
+    HistoryStoreの行 (ID × 変数) を1つずつ取り込み、列ごとにスペクトルを推定するクラスの共通部分。
+    直近 buffer_length サンプルをリングバッファに保持する。
+    """
+    def __init__(self, data_processor, buffer_length):
+        self.data_processor = data_processor
+        self.buffer_length = max(1, int(buffer_length))
+        self.reset()
+
+    def reset(self):
+        """内部状態をすべて破棄する"""
+        self.slot_index = {}
+        self.samples_seen = 0
+        self._buffer = np.full((self.buffer_length, 0, len(ALL_VARIABLES)), np.nan)
+        self._pos = 0
+        self._filled = 0
+        self._reset_state()
+
+    def _reset_state(self):
+        """子クラス固有の状態を初期化する"""
+        pass
+
+    def _add_slot_state(self):
+        """新しいIDのスロットが追加されたときに、子クラス固有の配列を拡張する"""
+        pass
+
+    def _sync_slots(self, slot_ids):
+        """historyのID軸に合わせてスロットを追加する (IDの並び順はhistoryと同じ)"""
+        for id_name in slot_ids[len(self.slot_index):]:
+            self.slot_index[id_name] = len(self.slot_index)
+            new_slot = np.full((self.buffer_length, 1, len(ALL_VARIABLES)), np.nan)
+            self._buffer = np.concatenate([self._buffer, new_slot], axis=1)
+            self._add_slot_state()
+
+    def _rows(self, history, start, end_index):
+        """
+        history[start:end_index] の行を (時間 × スロット × 変数) で返す。
+        渡されたビューのID軸が推定器のスロットより少ない (IDが増える前に切り出された) 場合は、足りないスロットをNaNで埋める。
+        """
+        rows = history.values[start:end_index]
+        missing_slots = len(self.slot_index) - rows.shape[1]
+        if missing_slots > 0:
+            rows = np.concatenate([rows, np.full((len(rows), missing_slots, len(ALL_VARIABLES)), np.nan)], axis=1)
+        return rows
+
+    def _store(self, row):
+        """リングバッファに1サンプル書き込み、押し出された古いサンプルを返す"""
+        old = self._buffer[self._pos].copy()
+        self._buffer[self._pos] = row
+        self._pos = (self._pos + 1) % self.buffer_length
+        self._filled = min(self._filled + 1, self.buffer_length)
+        self.samples_seen += 1
+        return old
+
+    def _chronological_buffer(self):
+        """バッファ内のデータを古い順に並べた配列を返す"""
+        if self._filled < self.buffer_length:
+            return self._buffer[:self._filled]
+        return np.roll(self._buffer, -self._pos, axis=0)
+
+    def _resolve_columns(self, active_ids):
+        """active_idsに対応する (ID, 変数名) の列と、そのスロット・変数インデックスを返す"""
+        columns = [(id_name, var) for id_name in active_ids if id_name in self.slot_index for var in ALL_VARIABLES]
+        slots = np.array([self.slot_index[id_name] for id_name, _ in columns], dtype=int)
+        var_indices = np.array([ALL_VARIABLES.index(var) for _, var in columns], dtype=int)
+        return columns, slots, var_indices
+
+    def _compute_from_buffer(self, columns, slots, var_indices, col_indices, slopes, spectrums):
+        """指定列をバッファ内のデータから厳密に計算し、結果を辞書に追加する"""
+        matrix = self._chronological_buffer()[:, slots[col_indices], var_indices[col_indices]]
+        exact_slopes, exact_spectrums = self.data_processor.compute_columns(matrix, [columns[col] for col in col_indices])
+        slopes.update(exact_slopes)
+        spectrums.update(exact_spectrums)
+
+    def _collect_amplitudes(self, columns, col_indices, frequency, amplitude, slopes, spectrums):
+        """推定した振幅スペクトルから傾きを一括で求め、結果を辞書に追加する"""
+        col_slopes, col_intercepts, valid = self.data_processor.fit_loglog_slopes(frequency, amplitude)
+        self.data_processor.collect_results(
+            [columns[col] for col in col_indices], frequency, amplitude,
+            col_slopes, col_intercepts, valid, slopes, spectrums
+        )
+
+
+class SlidingSpectrumEstimator(_StreamingSpectrumBase):
+    """
+    スライディング窓のスペクトルを、1サンプル追加ごとに O(周波数ビン数) で更新するクラス。
+    (スライディングDFT: X_k ← (X_k - x_old + x_new) * e^{j2πk/N})
+
+    窓内にNaNを含む列や、窓が埋まる前の列は、DataProcessorによる厳密計算に切り替える。
+    数値誤差の蓄積を防ぐため、一定サンプルごとに全列を厳密なFFTで再同期する。
+    """
+    def __init__(self, data_processor, window, resync_interval=256):
+        self.window = max(1, int(window))
+        self.resync_interval = max(1, int(resync_interval))
+        self.frequency = np.fft.rfftfreq(self.window, d=1.0)
+        # 1サンプル進めるごとに各ビンへ掛ける回転因子
+        self._twiddle = np.exp(2j * np.pi * np.arange(len(self.frequency)) / self.window)
+        super().__init__(data_processor, self.window)
+
+    def _reset_state(self):
+        self._bins = np.zeros((len(self.frequency), 0, len(ALL_VARIABLES)), dtype=complex)
+        self._nan_count = np.zeros((0, len(ALL_VARIABLES)), dtype=int)
+        self._dirty = np.zeros((0, len(ALL_VARIABLES)), dtype=bool)
+        self._since_resync = 0
+
+    def _add_slot_state(self):
+        num_vars = len(ALL_VARIABLES)
+        self._bins = np.concatenate([self._bins, np.zeros((len(self.frequency), 1, num_vars), dtype=complex)], axis=1)
+        # 新しい列は窓全体がNaNの状態から始まる
+        self._nan_count = np.concatenate([self._nan_count, np.full((1, num_vars), self.window)], axis=0)
+        self._dirty = np.concatenate([self._dirty, np.ones((1, num_vars), dtype=bool)], axis=0)
+
+    def push(self, row):
+        """新しいサンプル (ID × 変数) を1つ取り込み、スペクトルを更新する"""
+        was_full = self._filled == self.window
+        old = self._store(row)
+        self._nan_count += np.isnan(row).astype(int) - np.isnan(old).astype(int)
+        self._since_resync += 1
+
+        if was_full:
+            delta = row - old
+            self._bins = (self._bins + delta[np.newaxis]) * self._twiddle[:, np.newaxis, np.newaxis]
+            self._dirty |= np.isnan(delta)
+
+        if self._filled == self.window:
+            # 窓が埋まった直後と、一定サンプルごとに全列を再同期する
+            if not was_full or self._since_resync >= self.resync_interval:
+                self.resync()
+            else:
+                # NaNが窓から抜けた列だけを厳密なFFTで復帰させる
+                recovered = self._dirty & (self._nan_count == 0)
+                if recovered.any():
+                    self.resync(recovered)
+
+    def advance(self, history, end_index):
+        """
+        history[:end_index] までのサンプルを取り込む (巻き戻しはできない)。
+        窓長より先へ飛ぶ場合は、間のサンプルを読み飛ばして直近の窓だけを取り込む。
+        """
+        self._sync_slots(history.slot_ids)
+        start = max(self.samples_seen, end_index - self.window)
+        if start > self.samples_seen:
+            self.samples_seen = start
+            self._pos, self._filled = 0, 0
+            self._buffer[:] = np.nan
+            self._nan_count[:] = self.window
+            self._dirty[:] = True
+        for row in self._rows(history, start, end_index):
+            self.push(row)
+
+    def resync(self, columns=None):
+        """ビンを厳密なFFTで計算し直す。columnsを指定した場合はその列だけを更新する"""
+        chronological = self._chronological_buffer()
+        if columns is None:
+            self._bins = np.fft.rfft(chronological, axis=0)
+            self._dirty = self._nan_count > 0
+            self._since_resync = 0
+        else:
+            self._bins[:, columns] = np.fft.rfft(chronological[:, columns], axis=0)
+            self._dirty &= ~columns
+
+    def get_features(self, active_ids):
+        """現在の窓に対する (slope_df, power_spectrums) を返す"""
+        columns, slots, var_indices = self._resolve_columns(active_ids)
+        slopes, spectrums = {}, {}
+        if self._filled == 0 or not columns:
+            return self.data_processor.build_features(active_ids, slopes, spectrums)
+
+        # 窓が埋まっていてNaNを含まない列はスライディングDFTの結果をそのまま使う
+        incremental = np.zeros(len(columns), dtype=bool)
+        if self._filled == self.window:
+            incremental = ~self._dirty[slots, var_indices]
+
+        if incremental.any():
+            inc_cols = np.flatnonzero(incremental)
+            amplitude = np.abs(self._bins[:, slots[inc_cols], var_indices[inc_cols]]) / (self.window / 2)
+            self._collect_amplitudes(columns, inc_cols, self.frequency, amplitude, slopes, spectrums)
+
+        if not incremental.all():
+            self._compute_from_buffer(columns, slots, var_indices, np.flatnonzero(~incremental), slopes, spectrums)
+
+        return self.data_processor.build_features(active_ids, slopes, spectrums)
+
+
+class WelchSpectrumAccumulator(_StreamingSpectrumBase):
+    """
+    全区間のスペクトルを、固定長セグメントの平均 (Welch法) として逐次推定するクラス。
+
+    半分ずつ重なるセグメントが揃うたびに、そのセグメントだけをFFTしてパワーを加算する。
+    1サンプルあたりの計算量は履歴の長さに依存しない (償却 O(log セグメント長))。
+    NaNを含むセグメントは、その列については加算しない。
+    """
+    def __init__(self, data_processor, segment_length=64):
+        self.segment_length = max(4, int(segment_length))
+        self.hop = max(1, self.segment_length // 2)
+        self.frequency = np.fft.rfftfreq(self.segment_length, d=1.0)
+        # 漏れを抑えるためハン窓を掛け、振幅は窓の和で正規化する (既存の |X| / (n/2) と同じ尺度)
+        self._taper = np.hanning(self.segment_length)
+        self._amplitude_scale = self._taper.sum() / 2
+        super().__init__(data_processor, self.segment_length)
+
+    def _reset_state(self):
+        self._power_sum = np.zeros((len(self.frequency), 0, len(ALL_VARIABLES)))
+        self._segment_count = np.zeros((0, len(ALL_VARIABLES)), dtype=int)
+
+    def _add_slot_state(self):
+        num_vars = len(ALL_VARIABLES)
+        self._power_sum = np.concatenate([self._power_sum, np.zeros((len(self.frequency), 1, num_vars))], axis=1)
+        self._segment_count = np.concatenate([self._segment_count, np.zeros((1, num_vars), dtype=int)], axis=0)
+
+    def push(self, row):
+        """新しいサンプル (ID × 変数) を1つ取り込み、セグメントが揃っていればパワーを加算する"""
+        self._store(row)
+        is_segment_end = (self.samples_seen - self.segment_length) % self.hop == 0
+        if self.samples_seen >= self.segment_length and is_segment_end:
+            segment = self._chronological_buffer() * self._taper[:, np.newaxis, np.newaxis]
+            complete = ~np.isnan(segment).any(axis=0)
+            power = np.abs(np.fft.rfft(np.nan_to_num(segment), axis=0)) ** 2
+            self._power_sum += np.where(complete[np.newaxis], power, 0.0)
+            self._segment_count += complete.astype(int)
+
+    def advance(self, history, end_index):
+        """history[:end_index] までのサンプルを取り込む (巻き戻しはできない)"""
+        self._sync_slots(history.slot_ids)
+        for row in self._rows(history, self.samples_seen, end_index):
+            self.push(row)
+
+    def get_features(self, active_ids):
+        """これまでに取り込んだ全サンプルに対する (slope_df, power_spectrums) を返す"""
+        columns, slots, var_indices = self._resolve_columns(active_ids)
+        slopes, spectrums = {}, {}
+        if self._filled == 0 or not columns:
+            return self.data_processor.build_features(active_ids, slopes, spectrums)
+
+        counts = self._segment_count[slots, var_indices]
+        averaged = counts > 0
+        if averaged.any():
+            avg_cols = np.flatnonzero(averaged)
+            mean_power = self._power_sum[:, slots[avg_cols], var_indices[avg_cols]] / counts[avg_cols]
+            amplitude = np.sqrt(mean_power) / self._amplitude_scale
+            self._collect_amplitudes(columns, avg_cols, self.frequency, amplitude, slopes, spectrums)
+
+        # まだ完全なセグメントが1つもない列は、直近セグメント分のデータから直接計算する
+        if not averaged.all():
+            self._compute_from_buffer(columns, slots, var_indices, np.flatnonzero(~averaged), slopes, spectrums)
+
+        return self.data_processor.build_features(active_ids, slopes, spectrums)
@@ -3,18 +3,20 @@ from multiprocessing import Queue, Event
 import multiprocessing
 import time
 import logging
-import queue
 
 from .realtime_orchestrator import RealtimeOrchestrator
+from .pipeline_metrics import PipelineMetrics
+from .shared_frame_ring import SharedFrameRing
+from .shared_feature_ring import SharedFeatureRing
 from .process_utils import Status, StatusMessage
 
 logger = logging.getLogger(__name__)
 
 class CaptureService:
     # 【修正】analysis_active イベントを追加
-    def __init__(self, data_queue: Queue, frame_queue: Queue, status_queue: Queue, config: dict, analysis_active: Event):
-        self.data_queue = data_queue
-        self.frame_queue = frame_queue
+    def __init__(self, feature_ring: SharedFeatureRing, frame_ring: SharedFrameRing, status_queue: Queue, config: dict, analysis_active: Event):
+        self.feature_ring = feature_ring # 特徴量レコードの受け渡し用 (共有メモリのリングバッファ)
+        self.frame_ring = frame_ring # 描画済みフレームの受け渡し用 (共有メモリのリングバッファ)
         self.status_queue = status_queue
         self.config = config
         self.analysis_active = analysis_active # 解析モード切り替え用
@@ -28,7 +30,7 @@ class CaptureService:
         self.running.set()
         self._process = multiprocessing.Process(
             target=self._run_capture_loop,
-            args=(self.data_queue, self.frame_queue, self.status_queue, self.running, self.config, self.analysis_active),
+            args=(self.feature_ring, self.frame_ring, self.status_queue, self.running, self.config, self.analysis_active),
             daemon=True
         )
         self._process.start()
@@ -45,7 +47,7 @@ class CaptureService:
         self._process = None
 
     @staticmethod
-    def _run_capture_loop(data_queue, frame_queue, status_queue, running_event, config, analysis_active_event):
+    def _run_capture_loop(feature_ring, frame_ring, status_queue, running_event, config, analysis_active_event):
         """【別プロセス】映像処理ループ"""
         logger.info("(別プロセス) 映像処理プロセスを開始します。")
         try:
@@ -55,33 +57,42 @@ class CaptureService:
             status_queue.put(StatusMessage(Status.ERROR, f"Orchestratorの初期化に失敗しました:\n{e}"))
             return
 
+        frame_seq = 0 # 解析したフレームの通し番号
         while running_event.is_set():
             try:
                 # --- ここからロジックを大幅に変更 ---
                 if analysis_active_event.is_set():
                     # 【解析モード】YOLOとMediaPipeを使った本格処理
                     feature_packet, annotated_frame = orchestrator.process_one_frame()
+                    frame_seq += 1
                     if feature_packet:
-                        data_queue.put(feature_packet, timeout=1)
+                        with orchestrator.metrics.measure('feature_put'):
+                            feature_ring.put_packet(feature_packet, frame_seq)
                 else:
                     # 【プレビューモード】映像取得のみの軽量処理
-                    ret, frame = orchestrator.video_source.get_frame()
+                    with orchestrator.metrics.measure('capture'):
+                        ret, frame = orchestrator.video_source.get_frame()
                     if not ret:
                         logger.info("(別プロセス) 映像ソースの終端に達しました。")
                         status_queue.put(StatusMessage(Status.COMPLETED, "映像の再生が完了しました。"))
                         break
+                    orchestrator.metrics.set_counter('dropped_frames', orchestrator.video_source.dropped_frames)
                     annotated_frame = frame # 描画なしの元フレーム
                     feature_packet = None # 特徴量データなし
 
-                # フレームキューへの送信は両モード共通
+                # フレームの受け渡しは両モード共通 (UI側は常に最新のスロットだけを読む)
                 if annotated_frame is not None:
-                    if not frame_queue.empty():
-                        frame_queue.get_nowait()
-                    frame_queue.put(annotated_frame, timeout=1)
+                    with orchestrator.metrics.measure('frame_put'):
+                        frame_ring.put(annotated_frame)
+                    # UI側が読む前に上書きしたフレーム数 (表示が追いついていない度合い)
+                    orchestrator.metrics.set_counter('frame_overwrites', frame_ring.overwritten_frames)
+                    orchestrator.metrics.frame_done()
+
+                # 処理段階ごとの所要時間を定期的にメインプロセスへ通知する
+                if orchestrator.metrics.should_publish():
+                    summary = orchestrator.metrics.summary()
+                    status_queue.put(StatusMessage(Status.METRICS, PipelineMetrics.format_summary(summary), data=summary))
 
-            except queue.Full:
-                logger.warning("(別プロセス) UI側の処理が追いついていないため、フレームをスキップしました。")
-                continue
             except Exception as e:
                 import traceback
                 logger.error(f"(別プロセス) フレーム処理中に予期せぬエラー: {e}\n{traceback.format_exc()}")
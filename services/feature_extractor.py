@@ -5,45 +5,258 @@ import mediapipe as mp
 from mediapipe.tasks import python
 from mediapipe.tasks.python import vision
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from constants import ALL_VARIABLES
 from .analysis_utils import calculate_emotion_features, calculate_head_pose_features
+from .pipeline_metrics import measure_stage
 
 logger = logging.getLogger(__name__)
 
+# 顔の枠のうち、この割合以上が人物の枠に含まれていればその人物の顔とみなす
+_FACE_CONTAINMENT_THRESHOLD = 0.5
+
+class _VideoLandmarker:
+    """VIDEOモードのlandmarkerと、最後に渡したタイムスタンプ (単調増加させる必要がある) を保持する"""
+    def __init__(self, landmarker):
+        self.landmarker = landmarker
+        self.last_timestamp_ms = -1
+        self.last_seen = None # 最後に使った時刻 (秒)
+
+    def detect(self, mp_image, timestamp):
+        # 同じ時刻や逆行した時刻はMediaPipeが受け付けないため、1ミリ秒ずつ進める
+        timestamp_ms = max(int(timestamp * 1000), self.last_timestamp_ms + 1)
+        self.last_timestamp_ms = timestamp_ms
+        self.last_seen = timestamp
+        return self.landmarker.detect_for_video(mp_image, timestamp_ms)
+
+    def close(self):
+        self.landmarker.close()
+
 class FeatureExtractor:
-    """MediaPipeを使い、人物画像から特徴量を抽出するクラス。"""
+    """
+    MediaPipeを使い、人物画像から特徴量を抽出するクラス。
+
+    extract は人物ごとの切り抜き画像から1人分の特徴量を求める。
+    extract_many は複数の切り抜き画像を、num_workers 本のスレッド (それぞれ専用のlandmarkerを持つ) で並列に処理する。
+    extract_frame はフレーム全体で一度だけ顔を検出し (最大 max_faces 人)、
+    検出した顔を人物の枠に割り当てて全員分の特徴量を求める。
 
-    def __init__(self, model_path):
+    running_mode="video" の場合は、MediaPipeのVIDEOモード (detect_for_video) を使い、
+    前のフレームの顔の位置を引き継ぐことで顔検出を省略させる。切り抜き画像は追跡IDごとに
+    専用のlandmarkerで処理し、idle_sec 秒以上現れなかったIDのlandmarkerは evict_idle で破棄する。
+    """
+
+    def __init__(self, model_path, max_faces=1, num_workers=1, running_mode="image", idle_sec=2.0):
         logger.info(f"MediaPipeモデル '{model_path}' を読み込んでいます...")
-        base_options = python.BaseOptions(model_asset_path=model_path)
+        self.model_path = model_path
+        self.max_faces = max(1, int(max_faces))
+        self.running_mode = running_mode
+        self.idle_sec = float(idle_sec)
+        if self.running_mode == "video":
+            self.landmarker = _VideoLandmarker(self._create_landmarker(vision.RunningMode.VIDEO))
+        else:
+            self.landmarker = self._create_landmarker()
+        self._track_landmarkers = {} # 追跡ID → _VideoLandmarker
+        logger.info("MediaPipeモデルの読み込みが完了しました。")
+
+        # 切り抜き画像を並列に処理するスレッドプール (スレッドごとに専用のlandmarkerを持つ)
+        self.num_workers = max(1, int(num_workers))
+        self._executor = None
+        self._local = threading.local()
+        self._worker_landmarkers = []
+        self._worker_lock = threading.Lock()
+        if self.num_workers > 1:
+            # VIDEOモードではIDごとのlandmarkerを使うため、スレッド専用のlandmarkerは作らない
+            self._executor = ThreadPoolExecutor(max_workers=self.num_workers, thread_name_prefix="landmarker",
+                                                initializer=self._init_worker if self.running_mode == "image" else None)
+            logger.info(f"特徴量抽出のスレッドプールを作成しました。(スレッド数: {self.num_workers})")
+
+    def _create_landmarker(self, running_mode=None):
+        base_options = python.BaseOptions(model_asset_path=self.model_path)
         options = vision.FaceLandmarkerOptions(
             base_options=base_options,
+            running_mode=running_mode or vision.RunningMode.IMAGE,
             output_face_blendshapes=True,
             output_facial_transformation_matrixes=True,
-            num_faces=1
+            num_faces=self.max_faces
         )
-        self.landmarker = vision.FaceLandmarker.create_from_options(options)
-        logger.info("MediaPipeモデルの読み込みが完了しました。")
+        return vision.FaceLandmarker.create_from_options(options)
 
-    def extract(self, person_image):
+    def _init_worker(self):
+        """【ワーカースレッド】スレッド専用のlandmarkerを作成する"""
+        self._local.landmarker = self._create_landmarker()
+        with self._worker_lock:
+            self._worker_landmarkers.append(self._local.landmarker)
+
+    def extract(self, person_image, person_id=None, timestamp=None):
         """
         人物画像から特徴量を計算して返す。（ヘルパー関数を利用）
+        VIDEOモードでは person_id ごとのlandmarkerを使う。
+        """
+        if self.running_mode == "video" and person_id is not None:
+            return self._extract_with(self._get_track_landmarker(person_id), person_image, timestamp)
+        return self._extract_with(self.landmarker, person_image, timestamp)
+
+    def extract_many(self, person_images, person_ids=None, timestamp=None, metrics=None):
         """
+        複数の人物画像の特徴量を、入力と同じ順序のリストで返す。
+        スレッドプールがあれば並列に処理する (MediaPipeの推論中はGILが解放される)。
+        IMAGEモードでは各スレッド専用のlandmarkerを、VIDEOモードでは person_ids ごとのlandmarkerを使う。
+        metricsを渡すと、1人あたりの所要時間を 'extract' として記録する。
+        """
+        use_tracks = self.running_mode == "video" and person_ids is not None
+        if use_tracks:
+            timestamp = timestamp if timestamp is not None else time.time()
+            # landmarkerの作成はこのスレッドで行い、ワーカーには画像の番号だけを渡す
+            landmarkers = [self._get_track_landmarker(person_id) for person_id in person_ids]
+        # スレッド専用のlandmarkerはIMAGEモードでしか作らないため、VIDEOモードでIDがなければ逐次処理する
+        parallel = self._executor is not None and len(person_images) > 1 and (use_tracks or self.running_mode == "image")
+
+        def extract_one(index):
+            if use_tracks:
+                landmarker = landmarkers[index]
+            elif parallel:
+                landmarker = self._local.landmarker # 【ワーカースレッド】スレッド専用のlandmarker
+            else:
+                landmarker = self.landmarker
+            with measure_stage(metrics, 'extract'):
+                return self._extract_with(landmarker, person_images[index], timestamp)
+
+        if parallel:
+            return list(self._executor.map(extract_one, range(len(person_images))))
+        return [extract_one(index) for index in range(len(person_images))]
+
+    def _extract_with(self, landmarker, person_image, timestamp=None):
         # MediaPipeが要求するRGB形式に変換
         mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=cv2.cvtColor(person_image, cv2.COLOR_BGR2RGB))
-        
+
         # ランドマークを検出
-        detection_result = self.landmarker.detect(mp_image)
+        detection_result = self._detect(landmarker, mp_image, timestamp)
+        return self._features_from_result(detection_result, 0)
+
+    @staticmethod
+    def _detect(landmarker, mp_image, timestamp):
+        if isinstance(landmarker, _VideoLandmarker):
+            return landmarker.detect(mp_image, timestamp if timestamp is not None else time.time())
+        return landmarker.detect(mp_image)
 
+    def _get_track_landmarker(self, person_id):
+        """追跡IDに対応するVIDEOモードのlandmarkerを返す (なければ作成する)"""
+        landmarker = self._track_landmarkers.get(person_id)
+        if landmarker is None:
+            landmarker = self._track_landmarkers[person_id] = _VideoLandmarker(self._create_landmarker(vision.RunningMode.VIDEO))
+            logger.info(f"ID '{person_id}' 用のlandmarkerを作成しました。(保持数: {len(self._track_landmarkers)})")
+        return landmarker
+
+    def evict_idle(self, timestamp=None):
+        """
+        idle_sec 秒以上使われていないIDのlandmarkerを破棄する (VIDEOモードのみ)。
+        人物がいないフレームでも解放されるよう、抽出の有無にかかわらずフレームごとに呼ぶ。
+        """
+        if not self._track_landmarkers:
+            return
+        now = timestamp if timestamp is not None else time.time()
+        idle_ids = [person_id for person_id, landmarker in self._track_landmarkers.items()
+                    if landmarker.last_seen is not None and now - landmarker.last_seen > self.idle_sec]
+        for person_id in idle_ids:
+            self._track_landmarkers.pop(person_id).close()
+        if idle_ids:
+            logger.info(f"画面から消えたIDのlandmarkerを破棄しました: {idle_ids}")
+
+    def close(self):
+        """スレッドプールを停止し、landmarkerを解放する"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        for landmarker in [self.landmarker] + self._worker_landmarkers + list(self._track_landmarkers.values()):
+            landmarker.close()
+        self._worker_landmarkers = []
+        self._track_landmarkers = {}
+
+    def extract_frame(self, frame, tracked_persons, timestamp=None):
+        """
+        フレーム全体から顔を一度に検出し、人物ごとの特徴量を返す。
+
+        Args:
+            frame (numpy.ndarray): 入力フレーム画像 (BGR)。
+            tracked_persons (list[dict]): PersonTracker.track の結果。
+            timestamp (float | None): フレームの取得時刻 (VIDEOモードで使う)。
+
+        Returns:
+            dict: 人物ID → 特徴量の辞書。顔が割り当てられなかった人物の特徴量は0になる。
+        """
+        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        detection_result = self._detect(self.landmarker, mp_image, timestamp)
+
+        height, width = frame.shape[:2]
+        face_boxes = [self._face_box(landmarks, width, height) for landmarks in detection_result.face_landmarks]
+        assignment = assign_faces_to_persons(face_boxes, [person['box'] for person in tracked_persons])
+
+        return {
+            person['id']: self._features_from_result(detection_result, assignment.get(index))
+            for index, person in enumerate(tracked_persons)
+        }
+
+    @staticmethod
+    def _features_from_result(detection_result, face_index):
+        """検出結果のうち face_index 番目の顔の特徴量を返す (Noneまたは顔がなければ全て0)"""
         # すべての変数を0で初期化
         features = {var: 0.0 for var in ALL_VARIABLES}
+        if face_index is None:
+            return features
 
         # 感情の計算をヘルパー関数に任せる
-        emotion_features = calculate_emotion_features(detection_result.face_blendshapes)
+        emotion_features = calculate_emotion_features(detection_result.face_blendshapes[face_index:face_index + 1])
         features.update(emotion_features)
 
         # 頭の向きの計算をヘルパー関数に任せる
-        head_pose_features = calculate_head_pose_features(detection_result.facial_transformation_matrixes)
+        head_pose_features = calculate_head_pose_features(detection_result.facial_transformation_matrixes[face_index:face_index + 1])
         features.update(head_pose_features)
-        
-        return features
\ No newline at end of file
+
+        return features
+
+    @staticmethod
+    def _face_box(landmarks, width, height):
+        """正規化されたランドマークを囲む枠 [x1, y1, x2, y2] をピクセル単位で返す"""
+        xs = np.fromiter((landmark.x for landmark in landmarks), dtype=float) * width
+        ys = np.fromiter((landmark.y for landmark in landmarks), dtype=float) * height
+        return [xs.min(), ys.min(), xs.max(), ys.max()]
+
+
+def assign_faces_to_persons(face_boxes, person_boxes):
+    """
+    顔の枠を人物の枠に1対1で割り当て、{人物のインデックス: 顔のインデックス} を返す。
+
+    顔の枠が人物の枠に含まれる割合 (包含率) の高い組から順に割り当てる。
+    包含率が同じ場合は、人物の枠とのIoUが高い方を優先する (大きな枠に小さな枠が重なっている場合の対策)。
+    """
+    if not face_boxes or len(person_boxes) == 0:
+        return {}
+
+    faces = np.asarray(face_boxes, dtype=float)[:, None, :]
+    persons = np.asarray([np.asarray(box, dtype=float) for box in person_boxes])[None, :, :]
+    width = np.clip(np.minimum(faces[..., 2], persons[..., 2]) - np.maximum(faces[..., 0], persons[..., 0]), 0, None)
+    height = np.clip(np.minimum(faces[..., 3], persons[..., 3]) - np.maximum(faces[..., 1], persons[..., 1]), 0, None)
+    intersection = width * height
+    face_area = (faces[..., 2] - faces[..., 0]) * (faces[..., 3] - faces[..., 1])
+    person_area = (persons[..., 2] - persons[..., 0]) * (persons[..., 3] - persons[..., 1])
+    containment = np.divide(intersection, face_area, out=np.zeros_like(intersection), where=face_area > 0)
+    union = face_area + person_area - intersection
+    iou = np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+    # (包含率, IoU) の降順に、顔と人物のどちらもまだ割り当てられていない組を採用する
+    order = np.lexsort((-iou.ravel(), -containment.ravel()))
+    assignment = {}
+    used_faces = set()
+    for flat_index in order:
+        face_index, person_index = divmod(int(flat_index), containment.shape[1])
+        if containment[face_index, person_index] < _FACE_CONTAINMENT_THRESHOLD:
+            break
+        if face_index in used_faces or person_index in assignment:
+            continue
+        assignment[person_index] = face_index
+        used_faces.add(face_index)
+    return assignment
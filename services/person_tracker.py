@@ -1,21 +1,61 @@
 # ファイル名: services/person_tracker.py (新規作成)
 
+import math
+import time
 import cv2
 import logging
+import numpy as np
 from ultralytics import YOLO
 from constants import ALL_VARIABLES, REALTIME_ID_PREFIX
+from .pipeline_metrics import measure_stage
 
 logger = logging.getLogger(__name__)
 
+# 動きの判定に使う縮小画像の間引き幅 (画素)
+_MOTION_STRIDE = 16
+# 伝播中の枠同士がこれ以上重なったら、取り違えを防ぐために検出し直す
+_OVERLAP_IOU_THRESHOLD = 0.5
+# 検出時間の移動平均の重み
+_LATENCY_SMOOTHING = 0.2
+
+def box_iou(box_a, box_b):
+    """2つのバウンディングボックス [x1, y1, x2, y2] のIoUを返す"""
+    x1, y1 = max(box_a[0], box_b[0]), max(box_a[1], box_b[1])
+    x2, y2 = min(box_a[2], box_b[2]), min(box_a[3], box_b[3])
+    intersection = max(0, x2 - x1) * max(0, y2 - y1)
+    area_a = max(0, box_a[2] - box_a[0]) * max(0, box_a[3] - box_a[1])
+    area_b = max(0, box_b[2] - box_b[0]) * max(0, box_b[3] - box_b[1])
+    union = area_a + area_b - intersection
+    return intersection / union if union > 0 else 0.0
+
 class PersonTracker:
-    """YOLOv8を使い、フレーム内の人物を検出・追跡するクラス。"""
+    """
+    YOLOv8を使い、フレーム内の人物を検出・追跡するクラス。
+
+    detect_interval > 1 の場合、YOLOによる検出は N フレームごとにだけ行い、
+    間のフレームでは直前の2回の検出から求めた速度で枠を移動させる (等速で伝播する)。
+    ただし、画面の変化が大きいとき・伝播中の枠が重なったときは、N を待たずに検出し直す。
+    auto_interval=True の場合は、検出にかかった時間から target_fps を満たす N を自動で決める。
+    """
 
-    def __init__(self, model_path, device='cpu'):
+    def __init__(self, model_path, device='cpu', metrics=None, detect_interval=1, auto_interval=False,
+                 target_fps=10.0, max_interval=10, motion_threshold=12.0):
         logger.info(f"YOLOv8モデル '{model_path}' をデバイス '{device}' で読み込んでいます...")
         self.model = YOLO(model_path)
         self.device = device
+        self.metrics = metrics # 処理時間の計測先 (PipelineMetrics)
+        self.max_interval = max(1, int(max_interval))
+        self.detect_interval = min(max(1, int(detect_interval)), self.max_interval)
+        self.auto_interval = auto_interval
+        self.target_fps = float(target_fps)
+        self.motion_threshold = float(motion_threshold) # 縮小画像の平均輝度差 (0-255) がこれを超えたら検出し直す
         logger.info("YOLOv8モデルの読み込みが完了しました。")
 
+        self._frames_since_detection = 0
+        self._tracks = {} # ID → (最後に検出した枠, 1フレームあたりの移動量)
+        self._reference_thumbnail = None # 最後に検出したフレームの縮小画像
+        self._detect_latency = None # 検出時間の移動平均 (秒)
+
     def track(self, frame):
         """
         フレーム内の人物を追跡し、結果を返す。
@@ -27,18 +67,93 @@ class PersonTracker:
             list[dict]: 追跡された人物情報のリスト。
                         例: [{'id': '1', 'box': [x1, y1, x2, y2]}]
         """
+        thumbnail = self._make_thumbnail(frame) if self.detect_interval > 1 or self.auto_interval else None
+        if self._needs_detection(thumbnail):
+            return self._detect(frame, thumbnail)
+        with measure_stage(self.metrics, 'propagate'):
+            return self._propagate(frame)
+
+    def _detect(self, frame, thumbnail):
+        """YOLOで検出・追跡し、各IDの枠と移動量を更新する"""
         # `persist=True` は追跡を継続するために重要
-        results = self.model.track(frame, persist=True, classes=[0], device=self.device, verbose=False)
-        
+        started = time.perf_counter()
+        with measure_stage(self.metrics, 'detect_track'):
+            results = self.model.track(frame, persist=True, classes=[0], device=self.device, verbose=False)
+        self._update_interval(time.perf_counter() - started)
+
         tracked_persons = []
+        tracks = {}
+        elapsed = self._frames_since_detection + 1
         if results[0].boxes.id is not None:
             boxes = results[0].boxes.xyxy.cpu().numpy().astype(int)
             track_ids = results[0].boxes.id.cpu().numpy().astype(int)
 
             for box, track_id in zip(boxes, track_ids):
+                person_id = f"{REALTIME_ID_PREFIX}{track_id}"
                 tracked_persons.append({
-                    "id": f"{REALTIME_ID_PREFIX}{track_id}",
+                    "id": person_id,
                     "box": box
                 })
-        annotated_frame = results[0].plot()
-        return tracked_persons, annotated_frame
\ No newline at end of file
+                previous = self._tracks.get(person_id)
+                velocity = (box - previous[0]) / elapsed if previous is not None else np.zeros(4)
+                tracks[person_id] = (box, velocity)
+
+        self._tracks = tracks
+        self._frames_since_detection = 0
+        self._reference_thumbnail = thumbnail
+        with measure_stage(self.metrics, 'annotate'):
+            annotated_frame = results[0].plot()
+        return tracked_persons, annotated_frame
+
+    def _propagate(self, frame):
+        """前回の検出結果を等速で移動させた枠を返す (YOLOは実行しない)"""
+        self._frames_since_detection += 1
+        height, width = frame.shape[:2]
+        limits = np.array([width, height, width, height])
+        tracked_persons = []
+        annotated_frame = frame.copy()
+        for person_id, (box, velocity) in self._tracks.items():
+            predicted = np.clip(np.rint(box + velocity * self._frames_since_detection), 0, limits).astype(int)
+            tracked_persons.append({"id": person_id, "box": predicted})
+            cv2.rectangle(annotated_frame, tuple(predicted[:2].tolist()), tuple(predicted[2:].tolist()), (0, 255, 255), 2)
+            cv2.putText(annotated_frame, person_id, (int(predicted[0]), max(0, int(predicted[1]) - 5)),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1)
+        return tracked_persons, annotated_frame
+
+    def _needs_detection(self, thumbnail):
+        """このフレームでYOLOを実行すべきかを判定する"""
+        if self.detect_interval <= 1 or self._reference_thumbnail is None:
+            return True
+        if self._frames_since_detection + 1 >= self.detect_interval:
+            return True
+        # 画面全体の変化が大きい (人の出入り・カメラの移動など)
+        if thumbnail.shape != self._reference_thumbnail.shape:
+            return True
+        if np.abs(thumbnail - self._reference_thumbnail).mean() > self.motion_threshold:
+            return True
+        # 伝播中の枠が重なりそう (取り違えの恐れがある)
+        boxes = [box + velocity * (self._frames_since_detection + 1) for box, velocity in self._tracks.values()]
+        for i in range(len(boxes)):
+            for j in range(i + 1, len(boxes)):
+                if box_iou(boxes[i], boxes[j]) > _OVERLAP_IOU_THRESHOLD:
+                    return True
+        return False
+
+    def _update_interval(self, latency):
+        """検出時間の移動平均から、target_fps を満たす検出間隔を決める"""
+        if self._detect_latency is None:
+            self._detect_latency = latency
+        else:
+            self._detect_latency += _LATENCY_SMOOTHING * (latency - self._detect_latency)
+        if self.auto_interval and self.target_fps > 0:
+            self.detect_interval = min(max(1, math.ceil(self._detect_latency * self.target_fps)), self.max_interval)
+        if self.metrics is not None:
+            self.metrics.set_counter('detect_interval', self.detect_interval)
+
+    @staticmethod
+    def _make_thumbnail(frame):
+        """動きの判定用に、間引いたグレースケールの縮小画像を作る"""
+        thumbnail = frame[::_MOTION_STRIDE, ::_MOTION_STRIDE]
+        if thumbnail.ndim == 3:
+            thumbnail = thumbnail.mean(axis=2)
+        return thumbnail.astype(np.float32)
@@ -0,0 +1,89 @@
+# ファイル名: services/pipeline_metrics.py (新規作成)
+
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+
+class PipelineMetrics:
+    """
+    映像処理パイプラインの処理段階ごとの所要時間を、直近 window 件のローリング窓で集計するクラス。
+    一定間隔ごとに p50/p95/p99 (ミリ秒) と処理FPSの要約を作成する。
+    """
+    def __init__(self, window=300, publish_interval=5.0):
+        self.window = max(1, int(window))
+        self.publish_interval = float(publish_interval)
+        self._samples = {}
+        self._counters = {}
+        self._frame_times = deque(maxlen=self.window)
+        self._last_published = time.perf_counter()
+
+    @contextmanager
+    def measure(self, stage):
+        """with文で囲んだ処理の所要時間を stage として記録する"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - started)
+
+    def record(self, stage, seconds):
+        """stageの所要時間 (秒) を1件記録する"""
+        # 特徴量抽出のスレッドプールからも呼ばれるため、作成と追加はそれぞれ1回の操作で行う
+        samples = self._samples.get(stage)
+        if samples is None:
+            samples = self._samples.setdefault(stage, deque(maxlen=self.window))
+        samples.append(seconds)
+
+    def set_counter(self, name, value):
+        """累積のカウンタ (読み飛ばしたフレーム数など) の現在値を記録する"""
+        self._counters[name] = value
+
+    def frame_done(self):
+        """1フレームの処理完了を記録する (FPSの計算に使う)"""
+        self._frame_times.append(time.perf_counter())
+
+    @property
+    def fps(self):
+        """直近の窓におけるフレーム処理レート"""
+        if len(self._frame_times) < 2:
+            return 0.0
+        elapsed = self._frame_times[-1] - self._frame_times[0]
+        return (len(self._frame_times) - 1) / elapsed if elapsed > 0 else 0.0
+
+    def summary(self):
+        """{'fps': float, 'stages': {stage: {'p50', 'p95', 'p99', 'count'}}, 'counters': {name: value}} 形式の要約を返す (時間はミリ秒)"""
+        stages = {}
+        for stage, samples in self._samples.items():
+            if not samples:
+                continue
+            p50, p95, p99 = np.percentile(np.fromiter(samples, dtype=float) * 1000, [50, 95, 99])
+            stages[stage] = {'p50': float(p50), 'p95': float(p95), 'p99': float(p99), 'count': len(samples)}
+        return {'fps': self.fps, 'stages': stages, 'counters': dict(self._counters)}
+
+    def should_publish(self):
+        """前回の要約から publish_interval 秒以上経過していればTrueを返し、計時をやり直す"""
+        now = time.perf_counter()
+        if now - self._last_published < self.publish_interval:
+            return False
+        self._last_published = now
+        return True
+
+    @staticmethod
+    def format_summary(summary):
+        """要約を1行の文字列にする"""
+        stages = ", ".join(
+            f"{stage} p50={values['p50']:.1f}/p95={values['p95']:.1f}/p99={values['p99']:.1f}ms"
+            for stage, values in summary['stages'].items()
+        )
+        text = f"{summary['fps']:.1f} FPS | {stages}"
+        counters = summary.get('counters')
+        if counters:
+            text += " | " + ", ".join(f"{name}={value}" for name, value in counters.items())
+        return text
+
+
+def measure_stage(metrics, stage):
+    """metricsがNoneでも使えるよう、計測用のコンテキストマネージャを返す"""
+    return metrics.measure(stage) if metrics is not None else nullcontext()
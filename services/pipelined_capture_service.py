@@ -0,0 +1,281 @@
+# ファイル名: services/pipelined_capture_service.py (新規作成)
+
+import heapq
+import logging
+import multiprocessing
+import queue
+from multiprocessing import Queue, Event
+
+from .pipeline_metrics import PipelineMetrics
+from .process_utils import Status, StatusMessage
+from .shared_feature_ring import SharedFeatureRing
+from .shared_frame_ring import SharedFrameRing
+
+logger = logging.getLogger(__name__)
+
+_QUEUE_TIMEOUT = 0.5
+
+def _put(target_queue, item, running_event):
+    """停止要求を確認しながら、空きができるまで待ってキューに入れる。停止された場合はFalse"""
+    while running_event.is_set():
+        try:
+            target_queue.put(item, timeout=_QUEUE_TIMEOUT)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _get(source_queue, running_event):
+    """停止要求を確認しながら、キューから1件取り出す。停止された場合は例外 queue.Empty を送出する"""
+    while running_event.is_set():
+        try:
+            return source_queue.get(timeout=_QUEUE_TIMEOUT)
+        except queue.Empty:
+            continue
+    raise queue.Empty
+
+def _make_metrics(config):
+    return PipelineMetrics(window=config.get('metrics_window', 300), publish_interval=config.get('metrics_interval_sec', 5.0))
+
+def _publish_metrics(metrics, stage_name, status_queue):
+    if metrics.should_publish():
+        summary = metrics.summary()
+        status_queue.put(StatusMessage(Status.METRICS, f"[{stage_name}] {PipelineMetrics.format_summary(summary)}", data=summary))
+
+
+def _grab_stage(config, frame_pool, free_slots, detect_queue, status_queue, running_event):
+    """【別プロセス】映像を取得し、空いているスロットに書き込んで検出段へ渡す"""
+    from .video_source import VideoSource
+    metrics = _make_metrics(config)
+    try:
+        video_source = VideoSource(config['video_source'], threaded=config.get('threaded_grabber', True))
+    except Exception as e:
+        status_queue.put(StatusMessage(Status.ERROR, f"映像ソースの初期化に失敗しました:\n{e}"))
+        _put(detect_queue, None, running_event)
+        return
+
+    try:
+        while running_event.is_set():
+            try:
+                slot = _get(free_slots, running_event)
+            except queue.Empty:
+                break
+            with metrics.measure('capture'):
+                ret, frame = video_source.get_frame()
+            if not ret:
+                logger.info("(別プロセス) 映像ソースの終端に達しました。")
+                status_queue.put(StatusMessage(Status.COMPLETED, "映像の再生が完了しました。"))
+                break
+            metrics.set_counter('dropped_frames', video_source.dropped_frames)
+            frame_pool.write_slot(slot, frame)
+            if not _put(detect_queue, (slot, video_source.last_timestamp), running_event):
+                break
+            metrics.frame_done()
+            _publish_metrics(metrics, 'grab', status_queue)
+    finally:
+        _put(detect_queue, None, running_event)
+        video_source.release()
+
+
+def _detect_stage(config, frame_pool, free_slots, detect_queue, extract_queue, frame_ring, status_queue,
+                  running_event, analysis_active_event, num_extract_workers):
+    """
+    【別プロセス】人物を追跡し、描画済みフレームを公開して抽出段へ渡す。
+    解析モードでないときは元のフレームをそのまま公開する。
+    抽出段へ渡すフレームには、この段で連番 (frame_seq) を振る。
+    """
+    from .person_tracker import PersonTracker
+    metrics = _make_metrics(config)
+    frame_seq = 0
+    try:
+        try:
+            person_tracker = PersonTracker(
+                model_path=config['yolo_model_path'],
+                device=config['device'],
+                metrics=metrics,
+                detect_interval=config.get('detect_interval', 1),
+                auto_interval=config.get('detect_interval_auto', False),
+                target_fps=config.get('detect_target_fps', 10.0),
+                max_interval=config.get('detect_max_interval', 10),
+                motion_threshold=config.get('detect_motion_threshold', 12.0)
+            )
+        except Exception as e:
+            status_queue.put(StatusMessage(Status.ERROR, f"人物追跡モデルの初期化に失敗しました:\n{e}"))
+            return
+
+        while running_event.is_set():
+            try:
+                item = _get(detect_queue, running_event)
+            except queue.Empty:
+                break
+            if item is None:
+                break
+
+            slot, timestamp = item
+            frame = frame_pool.read_slot(slot)
+            if not analysis_active_event.is_set():
+                # 【プレビューモード】描画なしの元フレームを公開し、スロットはすぐに返す
+                frame_ring.put(frame)
+                free_slots.put(slot)
+                metrics.frame_done()
+                continue
+
+            try:
+                tracked_persons, annotated_frame = person_tracker.track(frame)
+            except Exception as e:
+                logger.error(f"(別プロセス) 人物追跡中にエラーが発生しました: {e}")
+                tracked_persons, annotated_frame = [], frame
+            with metrics.measure('frame_put'):
+                frame_ring.put(annotated_frame)
+            metrics.set_counter('frame_overwrites', frame_ring.overwritten_frames) # UI側が読む前に上書きしたフレーム数
+
+            # 人物がいないフレームも、順序を保つために抽出段へ流す
+            frame_seq += 1
+            persons = [{'id': person['id'], 'box': [int(v) for v in person['box']]} for person in tracked_persons]
+            if not _put(extract_queue, (frame_seq, slot, timestamp, persons), running_event):
+                break
+            metrics.frame_done()
+            _publish_metrics(metrics, 'detect', status_queue)
+    finally:
+        for _ in range(num_extract_workers):
+            _put(extract_queue, None, running_event)
+
+
+def _extract_stage(config, frame_pool, free_slots, extract_queue, result_queue, status_queue, running_event):
+    """【別プロセス】人物ごとの特徴量を抽出し、スロットを返却して結果を整列段へ渡す"""
+    from .feature_extractor import FeatureExtractor
+    from .realtime_orchestrator import extract_person_features
+    metrics = _make_metrics(config)
+    feature_extractor = None
+    try:
+        try:
+            extraction_mode = config.get('extraction_mode', 'crop')
+            feature_extractor = FeatureExtractor(
+                model_path=config['mediapipe_model_path'],
+                max_faces=config.get('max_faces', 10) if extraction_mode == 'full_frame' else 1,
+                num_workers=config.get('extract_threads', 1) if extraction_mode == 'crop' else 1,
+                running_mode=config.get('landmarker_running_mode', 'image'),
+                idle_sec=config.get('landmarker_idle_sec', 2.0)
+            )
+        except Exception as e:
+            status_queue.put(StatusMessage(Status.ERROR, f"特徴量抽出モデルの初期化に失敗しました:\n{e}"))
+            return
+
+        while running_event.is_set():
+            try:
+                item = _get(extract_queue, running_event)
+            except queue.Empty:
+                break
+            if item is None:
+                break
+
+            frame_seq, slot, timestamp, persons = item
+            try:
+                packet = extract_person_features(feature_extractor, frame_pool.read_slot(slot), persons, metrics,
+                                                 timestamp=timestamp, mode=extraction_mode)
+            except Exception as e:
+                logger.error(f"(別プロセス) 特徴量抽出中にエラーが発生しました: {e}")
+                packet = {'timestamp': timestamp}
+            finally:
+                free_slots.put(slot)
+
+            # 失敗したフレームも送って、整列段が次の番号を待ち続けないようにする
+            if not _put(result_queue, (frame_seq, packet), running_event):
+                break
+            metrics.frame_done()
+            _publish_metrics(metrics, 'extract', status_queue)
+    finally:
+        _put(result_queue, None, running_event)
+        if feature_extractor is not None:
+            feature_extractor.close()
+
+
+def _collect_stage(feature_ring, result_queue, running_event, num_extract_workers):
+    """【別プロセス】抽出段の結果をframe_seqの順に並べ直し、特徴量の共有メモリに書き込む"""
+    pending = []
+    next_seq = 1
+    finished_workers = 0
+    while running_event.is_set() and finished_workers < num_extract_workers:
+        try:
+            item = _get(result_queue, running_event)
+        except queue.Empty:
+            break
+        if item is None:
+            finished_workers += 1
+            continue
+
+        heapq.heappush(pending, item)
+        while pending and pending[0][0] == next_seq:
+            frame_seq, packet = heapq.heappop(pending)
+            if len(packet) > 1: # timestamp以外に人物のデータがある
+                feature_ring.put_packet(packet, frame_seq)
+            next_seq += 1
+
+
+class PipelinedCaptureService:
+    """
+    映像取得・人物追跡・特徴量抽出をそれぞれ別プロセスで動かし、フレーム間で処理を重ね合わせるCaptureService。
+
+        取得 → (フレームプール + 検出キュー) → 追跡 → (抽出キュー) → 抽出 ×N → (結果キュー) → 整列
+
+    フレームは共有メモリ上のフレームプールのスロットで受け渡し、キューには小さなメッセージだけを流す。
+    空きスロットの数がパイプライン内のフレーム数の上限になる (取得段はスロットが空くまで待つ)。
+    出力はCaptureServiceと同じく、描画済みフレームをframe_ringへ、特徴量をframe_seq順にfeature_ringへ書き込む。
+    """
+    def __init__(self, feature_ring: SharedFeatureRing, frame_ring: SharedFrameRing, status_queue: Queue, config: dict, analysis_active: Event):
+        self.feature_ring = feature_ring
+        self.frame_ring = frame_ring
+        self.status_queue = status_queue
+        self.config = config
+        self.analysis_active = analysis_active
+        self.num_slots = max(2, int(config.get('pipeline_slots', 8)))
+        self.num_extract_workers = max(1, int(config.get('pipeline_extract_workers', 1)))
+        self.running = multiprocessing.Event()
+        self._processes = []
+        self._frame_pool = None
+
+    def start(self):
+        if any(process.is_alive() for process in self._processes):
+            return
+
+        self.running.set()
+        self._frame_pool = SharedFrameRing(
+            slots=self.num_slots,
+            max_width=self.config.get('frame_max_width', 1920),
+            max_height=self.config.get('frame_max_height', 1080)
+        )
+        free_slots = multiprocessing.Queue()
+        for slot in range(self.num_slots):
+            free_slots.put(slot)
+        detect_queue = multiprocessing.Queue(maxsize=self.num_slots)
+        extract_queue = multiprocessing.Queue(maxsize=self.num_slots)
+        result_queue = multiprocessing.Queue(maxsize=self.num_slots)
+
+        stages = [
+            (_grab_stage, (self.config, self._frame_pool, free_slots, detect_queue, self.status_queue, self.running)),
+            (_detect_stage, (self.config, self._frame_pool, free_slots, detect_queue, extract_queue, self.frame_ring,
+                             self.status_queue, self.running, self.analysis_active, self.num_extract_workers)),
+        ]
+        stages += [
+            (_extract_stage, (self.config, self._frame_pool, free_slots, extract_queue, result_queue, self.status_queue, self.running))
+            for _ in range(self.num_extract_workers)
+        ]
+        stages.append((_collect_stage, (self.feature_ring, result_queue, self.running, self.num_extract_workers)))
+
+        self._processes = [multiprocessing.Process(target=target, args=args, daemon=True) for target, args in stages]
+        for process in self._processes:
+            process.start()
+        logger.info(f"PipelinedCaptureServiceを開始しました。(抽出プロセス数: {self.num_extract_workers}, スロット数: {self.num_slots})")
+
+    def stop(self):
+        self.running.clear()
+        for process in self._processes:
+            process.join(timeout=2)
+            if process.is_alive():
+                logger.warning("パイプラインのプロセスが時間内に終了せず、強制終了します。")
+                process.terminate()
+        self._processes = []
+        if self._frame_pool:
+            self._frame_pool.close()
+            self._frame_pool = None
+        logger.info("PipelinedCaptureServiceを停止しました。")
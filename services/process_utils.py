@@ -9,6 +9,7 @@ class Status(Enum):
     INFO = auto()
     WARNING = auto()
     COMPLETED = auto() # 処理が正常に完了した
+    METRICS = auto() # 処理段階ごとの所要時間の要約 (dataに辞書を添付)
 
 class StatusMessage:
     """プロセス間通信で送受信するメッセージクラス"""
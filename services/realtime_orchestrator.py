@@ -7,10 +7,49 @@ import logging
 from .video_source import VideoSource
 from .person_tracker import PersonTracker
 from .feature_extractor import FeatureExtractor
+from .pipeline_metrics import PipelineMetrics, measure_stage
 from constants import REALTIME_ID_PREFIX # 定数をインポート
 
 logger = logging.getLogger(__name__)
 
+def extract_person_features(feature_extractor, frame, tracked_persons, metrics=None, timestamp=None, mode="crop"):
+    """
+    追跡された各人物の特徴量を抽出し、{'timestamp': t, 'ID_1': {変数名: 値}, ...} 形式のパケットを返す。
+
+    mode="crop" では人物ごとにフレームを切り抜いて1人ずつ顔を検出し、
+    mode="full_frame" ではフレーム全体で一度だけ顔を検出して人物の枠に割り当てる。
+    """
+    all_features = {'timestamp': timestamp if timestamp is not None else time.time()}
+    if mode == "full_frame":
+        if tracked_persons:
+            # フレーム全体で1回だけ検出するため、1人あたりの時間はなく、フレームあたりの時間を記録する
+            with measure_stage(metrics, 'extract_batch'):
+                all_features.update(feature_extractor.extract_frame(frame, tracked_persons, all_features['timestamp']))
+        return all_features
+
+    # バウンディングボックスで人物画像を切り抜き、空でないものだけを抽出する
+    person_ids, person_images = [], []
+    for person in tracked_persons:
+        x1, y1, x2, y2 = person['box']
+        person_image = frame[y1:y2, x1:x2]
+        if person_image.size == 0:
+            continue
+        person_ids.append(person['id'])
+        person_images.append(person_image)
+
+    # FeatureExtractorに渡して特徴量を取得 (スレッドプールがあれば並列に処理される)
+    if person_images:
+        # 1人あたりの時間は extract_many の中で 'extract' として、フレーム全体の時間は 'extract_batch' として記録する
+        with measure_stage(metrics, 'extract_batch'):
+            features_list = feature_extractor.extract_many(person_images, person_ids, all_features['timestamp'], metrics)
+        # 結果は入力と同じ順序なので、パケット内のIDの順序は逐次処理と変わらない
+        all_features.update(zip(person_ids, features_list))
+
+    # 画面から消えた人物のlandmarkerを解放する (人物がいないフレームでも呼ぶ)
+    feature_extractor.evict_idle(all_features['timestamp'])
+    return all_features
+
+
 class RealtimeOrchestrator:
     """
     リアルタイム解析のパイプライン全体を管理する司令塔クラス。
@@ -21,15 +60,31 @@ class RealtimeOrchestrator:
         """
         self.config = config
         logger.info("リアルタイム処理のオーケストレーターを初期化しています...")
+        # 処理段階ごとの所要時間を集計する
+        self.metrics = PipelineMetrics(
+            window=self.config.get('metrics_window', 300),
+            publish_interval=self.config.get('metrics_interval_sec', 5.0)
+        )
 
         # 各専門クラスのインスタンスを作成
-        self.video_source = VideoSource(self.config['video_source'])
+        self.video_source = VideoSource(self.config['video_source'], threaded=self.config.get('threaded_grabber', True))
         self.person_tracker = PersonTracker(
             model_path=self.config['yolo_model_path'],
-            device=self.config['device']
+            device=self.config['device'],
+            metrics=self.metrics,
+            detect_interval=self.config.get('detect_interval', 1),
+            auto_interval=self.config.get('detect_interval_auto', False),
+            target_fps=self.config.get('detect_target_fps', 10.0),
+            max_interval=self.config.get('detect_max_interval', 10),
+            motion_threshold=self.config.get('detect_motion_threshold', 12.0)
         )
+        self.extraction_mode = self.config.get('extraction_mode', 'crop')
         self.feature_extractor = FeatureExtractor(
-            model_path=self.config['mediapipe_model_path']
+            model_path=self.config['mediapipe_model_path'],
+            max_faces=self.config.get('max_faces', 10) if self.extraction_mode == 'full_frame' else 1,
+            num_workers=self.config.get('extract_threads', 1) if self.extraction_mode == 'crop' else 1,
+            running_mode=self.config.get('landmarker_running_mode', 'image'),
+            idle_sec=self.config.get('landmarker_idle_sec', 2.0)
         )
         logger.info("オーケストレーターの初期化が完了しました。")
 
@@ -38,38 +93,28 @@ class RealtimeOrchestrator:
         """
         1フレーム分の処理を実行し、整形されたデータパケットと描画済みフレームを返す。
         """
-        ret, frame = self.video_source.get_frame()
+        with self.metrics.measure('capture'):
+            ret, frame = self.video_source.get_frame()
         if not ret:
             return None, None
+        self.metrics.set_counter('dropped_frames', self.video_source.dropped_frames)
 
         # 1. 人物追跡
         tracked_persons, annotated_frame = self.person_tracker.track(frame)
         if not tracked_persons:
+            # 画面に誰もいない間も、消えた人物のlandmarkerは解放する
+            self.feature_extractor.evict_idle(self.video_source.last_timestamp)
             # 誰もいなくても、描画済み（この場合は元画像と同じ）フレームは返す
             return {}, annotated_frame
 
         # 2. 特徴量抽出
-        all_features = {'timestamp': time.time()}
-        for person in tracked_persons:
-            person_id = person['id']
-            box = person['box']
-
-            # バウンディングボックスで人物画像を切り抜き
-            x1, y1, x2, y2 = box
-            person_image = frame[y1:y2, x1:x2]
-
-            # 画像が空でないことを確認
-            if person_image.size == 0:
-                continue
-
-            # FeatureExtractorに渡して特徴量を取得
-            features = self.feature_extractor.extract(person_image)
-            all_features[person_id] = features
-
+        all_features = extract_person_features(self.feature_extractor, frame, tracked_persons, self.metrics,
+                                               timestamp=self.video_source.last_timestamp, mode=self.extraction_mode)
         return all_features, annotated_frame
 
     def release(self):
         """
         リソースを解放する。
         """
-        self.video_source.release()
\ No newline at end of file
+        self.video_source.release()
+        self.feature_extractor.close()
\ No newline at end of file
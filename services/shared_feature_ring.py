@@ -0,0 +1,154 @@
+# ファイル名: services/shared_feature_ring.py (新規作成)
+
+import logging
+from multiprocessing import shared_memory
+
+import numpy as np
+from constants import ALL_VARIABLES
+
+logger = logging.getLogger(__name__)
+
+# 1人・1フレーム分の特徴量レコード
+FEATURE_RECORD_DTYPE = np.dtype([
+    ('timestamp', np.float64),
+    ('frame_seq', np.int64),
+    ('track_id', np.int32), # IDテーブルのインデックス
+    ('values', np.float32, (len(ALL_VARIABLES),)),
+])
+
+# ヘッダー (int64) の配置: [書き込んだレコードの総数, IDテーブルに登録したIDの数]
+_WRITE_COUNT, _ID_COUNT = 0, 1
+_HEADER_FIELDS = 2
+_ID_NAME_BYTES = 32
+
+class SharedFeatureRing:
+    """
+    映像処理プロセスからUIプロセスへ特徴量を渡す、共有メモリ上の固定長レコードのリングバッファ。
+
+    パケット (IDごとの変数名 → 値の辞書) をpickleする代わりに、
+    (timestamp, frame_seq, track_id, float32[変数数]) のレコードとして書き込む。
+    ID名は小さなIDテーブルに一度だけ登録し、レコードにはそのインデックスを入れる。
+    読み込み側は未読のレコードをまとめてnumpy配列として取り出す。
+    書き込み側・読み込み側ともに1プロセスのみを想定する。
+    """
+    def __init__(self, capacity=4096, max_ids=256, name=None):
+        self.capacity = max(1, int(capacity))
+        self.max_ids = max(1, int(max_ids))
+        header_size = _HEADER_FIELDS * 8
+        id_table_size = self.max_ids * _ID_NAME_BYTES
+        records_size = self.capacity * FEATURE_RECORD_DTYPE.itemsize
+        self._is_owner = name is None
+        if self._is_owner:
+            self._shm = shared_memory.SharedMemory(create=True, size=header_size + id_table_size + records_size)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+
+        self._header = np.ndarray((_HEADER_FIELDS,), dtype=np.int64, buffer=self._shm.buf)
+        self._id_table = np.ndarray((self.max_ids,), dtype=f"S{_ID_NAME_BYTES}", buffer=self._shm.buf, offset=header_size)
+        self._records = np.ndarray((self.capacity,), dtype=FEATURE_RECORD_DTYPE, buffer=self._shm.buf, offset=header_size + id_table_size)
+        if self._is_owner:
+            self._header[:] = 0
+
+        # 書き込み側: ID名 → テーブルのインデックス / 読み込み側: 読み終えた位置と取り込んだID名
+        self._id_index = {}
+        self._warned_id_overflow = False
+        self.read_count = 0
+        self.id_names = []
+        self.dropped_records = 0
+
+    def __getstate__(self):
+        # 別プロセスへは共有メモリの名前だけを渡し、受け取った側で接続し直す
+        return {'capacity': self.capacity, 'max_ids': self.max_ids, 'name': self._shm.name}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    # --- 書き込み側 (映像処理プロセス) ---
+
+    def put_packet(self, packet, frame_seq):
+        """
+        {'timestamp': t, 'ID_1': {変数名: 値}, ...} 形式のパケットを、IDごとのレコードとして書き込む。
+        記録されていない変数はNaNになる。
+        """
+        timestamp = packet.get('timestamp', 0.0)
+        rows = []
+        for id_name, features in packet.items():
+            if id_name == 'timestamp':
+                continue
+            track_id = self._register_id(id_name)
+            if track_id is None:
+                continue
+            rows.append((timestamp, frame_seq, track_id, [features.get(var, np.nan) for var in ALL_VARIABLES]))
+        if rows:
+            self.put_records(np.array(rows, dtype=FEATURE_RECORD_DTYPE))
+
+    def put_records(self, records):
+        """レコードの配列をリングに書き込み、書き込み総数を更新して公開する"""
+        start = int(self._header[_WRITE_COUNT])
+        if len(records) > self.capacity:
+            start += len(records) - self.capacity
+            records = records[-self.capacity:]
+        positions = (start + np.arange(len(records))) % self.capacity
+        self._records[positions] = records
+        self._header[_WRITE_COUNT] = start + len(records)
+
+    def _register_id(self, id_name):
+        """ID名をテーブルに登録し、インデックスを返す。テーブルが一杯ならNone"""
+        track_id = self._id_index.get(id_name)
+        if track_id is not None:
+            return track_id
+        count = int(self._header[_ID_COUNT])
+        if count >= self.max_ids:
+            if not self._warned_id_overflow:
+                logger.warning(f"IDテーブルが一杯 ({self.max_ids}件) のため、新しいIDの特徴量を破棄します: {id_name}")
+                self._warned_id_overflow = True
+            return None
+        self._id_table[count] = id_name.encode('utf-8')[:_ID_NAME_BYTES]
+        self._header[_ID_COUNT] = count + 1
+        self._id_index[id_name] = count
+        return count
+
+    # --- 読み込み側 (UIプロセス) ---
+
+    def drain(self):
+        """
+        前回以降に書き込まれたレコードをまとめて返す (古い順)。
+        読み込みが追いつかずに上書きされたレコードは dropped_records に数えて読み飛ばす。
+        レコードの track_id は id_names のインデックス。
+        """
+        write_count = int(self._header[_WRITE_COUNT])
+        self._sync_id_names()
+        if write_count == self.read_count:
+            return np.empty(0, dtype=FEATURE_RECORD_DTYPE)
+
+        start = max(self.read_count, write_count - self.capacity)
+        self.dropped_records += start - self.read_count
+        positions = np.arange(start, write_count) % self.capacity
+        records = self._records[positions] # ファンシーインデックスなのでコピーになる
+
+        # コピー中に書き込み側が追い越した分は、内容が保証されないので捨てる
+        overwritten = int(self._header[_WRITE_COUNT]) - self.capacity - start
+        if overwritten > 0:
+            records = records[overwritten:]
+            self.dropped_records += overwritten
+
+        self.read_count = write_count
+        return records
+
+    def _sync_id_names(self):
+        """書き込み側が追加したID名を取り込む"""
+        count = int(self._header[_ID_COUNT])
+        for index in range(len(self.id_names), count):
+            self.id_names.append(self._id_table[index].decode('utf-8'))
+
+    @property
+    def pending(self):
+        """未読のレコード数 (読み込み側の遅れ)"""
+        return int(self._header[_WRITE_COUNT]) - self.read_count
+
+    def close(self):
+        """共有メモリへの接続を閉じる。作成したプロセスでは共有メモリ自体も破棄する"""
+        self._header = self._id_table = self._records = None
+        self._shm.close()
+        if self._is_owner:
+            self._shm.unlink()
@@ -0,0 +1,140 @@
+# ファイル名: services/shared_frame_ring.py (新規作成)
+
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+# ヘッダー (int64) の配置: 先頭3要素が全体の [最新のシーケンス番号, 最新のスロット, 読み込み側が最後に読んだシーケンス番号]、
+# 続いてスロットごとに [スロットのシーケンス (書き込み中は奇数), 高さ, 幅, チャンネル数]
+_GLOBAL_FIELDS = 3
+_SLOT_FIELDS = 4
+_LATEST_SEQ, _LATEST_SLOT, _READ_SEQ = 0, 1, 2
+_SLOT_SEQ, _HEIGHT, _WIDTH, _CHANNELS = 0, 1, 2, 3
+
+class SharedFrameRing:
+    """
+    映像処理プロセスからUIプロセスへフレームを渡す、共有メモリ上のリングバッファ。
+
+    あらかじめ確保したスロットに順番に書き込み、シーケンス番号で最新のフレームを知らせる。
+    各スロットはシーケンスロック (書き込み中はスロットのシーケンスが奇数) で保護する。
+    Queueと違いフレームをpickleしないため、プロセス間のコピーは書き込み時の1回だけになる。
+    書き込み側は1プロセスのみを想定する。
+    """
+    def __init__(self, slots=3, max_width=1920, max_height=1080, channels=3, name=None):
+        self.slots = max(2, int(slots))
+        self.max_width = int(max_width)
+        self.max_height = int(max_height)
+        self.channels = int(channels)
+        self.slot_size = self.max_width * self.max_height * self.channels
+        header_size = (_GLOBAL_FIELDS + self.slots * _SLOT_FIELDS) * 8
+        self._is_owner = name is None
+        if self._is_owner:
+            self._shm = shared_memory.SharedMemory(create=True, size=header_size + self.slots * self.slot_size)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+
+        self._header = np.ndarray((_GLOBAL_FIELDS + self.slots * _SLOT_FIELDS,), dtype=np.int64, buffer=self._shm.buf)
+        self._slot_header = self._header[_GLOBAL_FIELDS:].reshape(self.slots, _SLOT_FIELDS)
+        self._data = np.ndarray((self.slots, self.slot_size), dtype=np.uint8, buffer=self._shm.buf, offset=header_size)
+        if self._is_owner:
+            self._header[:] = 0
+        self._next_slot = 0
+        self.last_read_seq = 0
+        self.overwritten_frames = 0 # 【書き込み側】読み込み側に読まれないまま新しいフレームで置き換えたフレーム数
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def __getstate__(self):
+        # 別プロセスへは共有メモリの名前だけを渡し、受け取った側で接続し直す
+        return {'slots': self.slots, 'max_width': self.max_width, 'max_height': self.max_height,
+                'channels': self.channels, 'name': self._shm.name}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    @property
+    def latest_seq(self):
+        """これまでに書き込まれたフレーム数 (最新フレームのシーケンス番号)"""
+        return int(self._header[_LATEST_SEQ])
+
+    def put(self, frame):
+        """【書き込み側】フレームを次のスロットに書き込み、最新フレームとして公開する"""
+        if self.latest_seq > self._header[_READ_SEQ]:
+            self.overwritten_frames += 1 # 公開中のフレームは読まれないまま最新ではなくなる
+        slot = self._next_slot
+        self._next_slot = (slot + 1) % self.slots
+        self.write_slot(slot, frame)
+
+        self._header[_LATEST_SLOT] = slot
+        self._header[_LATEST_SEQ] += 1
+
+    def write_slot(self, slot, frame):
+        """
+        指定したスロットにフレームを書き込む (最新フレームとしては公開しない)。
+        スロットの割り当てを呼び出し側で管理する場合 (フレームプールとして使う場合) に使う。
+        """
+        frame = self._fit(frame)
+        height, width = frame.shape[:2]
+        channels = frame.shape[2] if frame.ndim == 3 else 1
+
+        slot_header = self._slot_header[slot]
+        slot_header[_SLOT_SEQ] += 1 # 奇数: 書き込み中
+        slot_header[_HEIGHT], slot_header[_WIDTH], slot_header[_CHANNELS] = height, width, channels
+        self._data[slot, :frame.size].reshape(frame.shape)[...] = frame
+        slot_header[_SLOT_SEQ] += 1 # 偶数: 書き込み完了
+
+    def read_slot(self, slot):
+        """指定したスロットのフレームを、共有メモリ上のビューとして返す"""
+        slot_header = self._slot_header[slot]
+        shape = (int(slot_header[_HEIGHT]), int(slot_header[_WIDTH]), int(slot_header[_CHANNELS]))
+        frame = self._data[slot, :shape[0] * shape[1] * shape[2]].reshape(shape)
+        return frame[:, :, 0] if shape[2] == 1 else frame
+
+    def _fit(self, frame):
+        """スロットに収まらないフレームは縦横比を保って縮小する"""
+        height, width = frame.shape[:2]
+        channels = frame.shape[2] if frame.ndim == 3 else 1
+        if channels > self.channels:
+            raise ValueError(f"フレームのチャンネル数 {channels} がリングの上限 {self.channels} を超えています。")
+        if height <= self.max_height and width <= self.max_width:
+            return np.ascontiguousarray(frame)
+        scale = min(self.max_height / height, self.max_width / width)
+        return cv2.resize(frame, (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+
+    def read_latest(self, copy=False):
+        """
+        【読み込み側】前回読んでから新しいフレームが書き込まれていれば、最新のフレームを返す。なければNone。
+
+        copy=False の場合は共有メモリ上のビューをそのまま返す (コピーなし)。
+        書き込み側は他のスロットを順に使うため、ビューは (スロット数 - 1) フレーム分は上書きされないが、
+        長く保持する場合は copy=True を指定すること。
+        """
+        seq = self.latest_seq
+        if seq == self.last_read_seq:
+            return None
+
+        slot = int(self._header[_LATEST_SLOT])
+        slot_header = self._slot_header[slot]
+        slot_seq = int(slot_header[_SLOT_SEQ])
+        if slot_seq % 2 == 1:
+            return None # 書き込み中 (次の呼び出しで読む)
+
+        frame = self.read_slot(slot)
+        if copy:
+            frame = frame.copy()
+        if int(slot_header[_SLOT_SEQ]) != slot_seq:
+            return None # 読んでいる間に上書きされた
+
+        self.last_read_seq = seq
+        self._header[_READ_SEQ] = seq
+        return frame
+
+    def close(self):
+        """共有メモリへの接続を閉じる。作成したプロセスでは共有メモリ自体も破棄する"""
+        self._header = self._slot_header = self._data = None
+        self._shm.close()
+        if self._is_owner:
+            self._shm.unlink()
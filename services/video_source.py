@@ -1,15 +1,23 @@
 # ファイル名: services/video_source.py (新規作成)
 
 import time
+import threading
 import cv2
 import logging
 
 logger = logging.getLogger(__name__)
 
 class VideoSource:
-    """カメラや動画ファイルからの映像取得を専門に担当するクラス。"""
+    """
+    カメラや動画ファイルからの映像取得を専門に担当するクラス。
+
+    threaded=True かつカメラ入力の場合は、バックグラウンドのスレッドが常にフレームを読み続け、
+    get_frame は最新のフレームだけを返す (処理が遅くてもカメラ内部のバッファに古いフレームが溜まらない)。
+    読み飛ばしたフレームの数は dropped_frames に数える。
+    動画ファイルは全フレームを解析するため、常に同期的に読み込む。
+    """
     
-    def __init__(self, source):
+    def __init__(self, source, threaded=False):
         # sourceが数字のみの文字列なら、整数(カメラ番号)に変換する
         processed_source = source
         if isinstance(source, str) and source.isdigit():
@@ -17,8 +25,21 @@ class VideoSource:
         
         self.source = source
         self.cap = None
+        self.last_seq = 0 # 最後に返したフレームのシーケンス番号 (ソースから読み込んだ順の通し番号)
+        self.last_timestamp = None # 最後に返したフレームの取得時刻 (time.time())
+        self.dropped_frames = 0 # 返さずに読み飛ばしたフレームの数
         self._open_source()
 
+        self.threaded = threaded and isinstance(processed_source, int)
+        self._grabber = None
+        if self.threaded:
+            self._condition = threading.Condition()
+            self._latest = None # (シーケンス番号, 取得時刻, フレーム)
+            self._grabbed_seq = 0
+            self._grabber_running = True
+            self._grabber = threading.Thread(target=self._grab_loop, daemon=True)
+            self._grabber.start()
+
     def _open_source(self):
         """映像ソースを開く。失敗した場合は数回リトライする。"""
         # --- ここから修正 ---
@@ -47,14 +68,52 @@ class VideoSource:
         Returns:
             tuple[bool, numpy.ndarray | None]: 読み込みの成否とフレーム画像。
         """
+        if self.threaded:
+            return self._get_latest_frame()
+
         if self.cap is None or not self.cap.isOpened():
             return False, None
         
         ret, frame = self.cap.read()
+        if ret:
+            self.last_seq += 1
+            self.last_timestamp = time.time()
         return ret, frame
 
+    def _grab_loop(self):
+        """【グラバースレッド】フレームを読み続け、最新の1枚だけを保持する"""
+        while self._grabber_running:
+            ret, frame = self.cap.read()
+            timestamp = time.time()
+            with self._condition:
+                if not ret:
+                    self._grabber_running = False # ソースの終端 (またはカメラの切断)
+                else:
+                    self._grabbed_seq += 1
+                    self._latest = (self._grabbed_seq, timestamp, frame)
+                self._condition.notify_all()
+
+    def _get_latest_frame(self):
+        """前回返したものより新しいフレームが届くまで待ち、最新のフレームを返す"""
+        with self._condition:
+            while (self._latest is None or self._latest[0] == self.last_seq) and self._grabber_running:
+                self._condition.wait(timeout=0.5)
+            if self._latest is None or self._latest[0] == self.last_seq:
+                return False, None
+
+            seq, timestamp, frame = self._latest
+        self.dropped_frames += seq - self.last_seq - 1
+        self.last_seq = seq
+        self.last_timestamp = timestamp
+        return True, frame
+
     def release(self):
         """リソースを解放する。"""
+        if self._grabber:
+            with self._condition:
+                self._grabber_running = False
+            self._grabber.join(timeout=2)
+            self._grabber = None
         if self.cap:
             logger.info("映像ソースを解放します。")
             self.cap.release()
\ No newline at end of file